@@ -0,0 +1,201 @@
+"""
+CHIP-8 assembler, using the mnemonics in Opcodes.op_code_map.
+
+    loop:   LD V0, 0x0A         ; one instruction or directive per line, comments start with ;
+            DRW V0, V1, 5
+            JP loop
+    sprite: DB 0xF0, 0b10010000, 0x90
+            DW 0x1234, sprite   ; 16 bit big endian words
+            DS 8, 0xFF          ; 8 bytes of 0xFF, the fill defaults to 0
+
+Numbers are decimal, 0x hex or 0b binary, and operands can add or subtract labels and numbers, e.g. `sprite + 5`.
+The count of a DS is worked out before the labels that follow it get their addresses, so it can only use numbers and
+labels defined above it, e.g. `DS 0x300 - end`.
+SHR and SHL without a Vy shift Vx in place under every quirk profile, by assembling as SHR Vx, Vx.
+
+python3 Assembler.py source.asm...   write source.ch8 next to each source
+"""
+import argparse
+import os
+import re
+from collections import namedtuple
+from Interpreter import Interpreter
+from Opcodes import op_code_map
+
+REGISTER = re.compile(r"V([0-9A-F])$", re.IGNORECASE)
+LABEL = re.compile(r"([A-Za-z_][A-Za-z0-9_.]*):")
+NUMBERS = {"byte": 0xFF, "addr": 0xFFF, "nibble": 0xF}  # Operand kind -> largest value
+SHIFTS = {"Vx": 8, "Vy": 4, "byte": 0, "addr": 0, "nibble": 0}
+
+Template = namedtuple("Template", ["pattern", "operands"])
+Statement = namedtuple("Statement", ["line", "address", "mnemonic", "template", "operands"])
+
+
+class AssemblyError(ValueError):
+    pass
+
+
+def _templates():  # Mnemonic -> the operand lists it can be written with, read from the op_code_map syntax
+    templates = {}
+    for pattern, syntax in op_code_map.items():
+        mnemonic, _, operands = syntax.partition(" ")
+        forms = [operands]
+        if "{" in operands:  # "SHR Vx {, Vy}"
+            forms = [operands.split("{")[0], operands.replace("{", "").replace("}", "")]
+        for form in forms:
+            kinds = [kind.strip() for kind in form.split(",") if kind.strip()]
+            templates.setdefault(mnemonic, []).append(Template(pattern, kinds))
+    return templates
+
+
+TEMPLATES = _templates()
+LITERALS = {kind.upper() for forms in TEMPLATES.values() for template in forms for kind in template.operands
+            if kind not in SHIFTS}  # I, [I], DT, ST, K, F, B and the V0 of JP V0, addr
+
+
+def _matches(kind, operand):
+    if kind in ("Vx", "Vy"):
+        return REGISTER.match(operand) is not None
+    if kind in NUMBERS:
+        return REGISTER.match(operand) is None and operand.upper() not in LITERALS
+    return operand.upper() == kind.upper()
+
+
+def _split_operands(text):
+    return [operand.strip() for operand in text.split(",")] if text.strip() else []
+
+
+def evaluate(expression, labels, line):
+    """Sum the numbers and labels in an expression such as `sprite + 5`"""
+    terms = re.split(r"([+-])", expression.replace(" ", ""))
+    total = 0
+    sign = 1
+    for term in terms:
+        if term in ("+", "-"):
+            sign = 1 if term == "+" else -1
+            continue
+        if not term:
+            continue
+        if term in labels:
+            value = labels[term]
+        else:
+            try:
+                value = int(term, 0)
+            except ValueError:
+                raise AssemblyError(F"line {line}: unknown label or bad number '{term}'") from None
+        total += sign * value
+    return total
+
+
+def _parse(source, origin):  # First pass: split the source into statements and give every label its address
+    labels = {}
+    statements = []
+    address = origin
+    for number, line in enumerate(source.splitlines(), 1):
+        line = line.split(";", 1)[0].strip()
+        label = LABEL.match(line)
+        if label:
+            if label.group(1) in labels:
+                raise AssemblyError(F"line {number}: label '{label.group(1)}' is already defined")
+            labels[label.group(1)] = address
+            line = line[label.end():].strip()
+        if not line:
+            continue
+
+        mnemonic, _, rest = line.partition(" ")
+        mnemonic = mnemonic.upper()
+        operands = _split_operands(rest)
+        if mnemonic in ("DB", "DW"):
+            size = len(operands) * (1 if mnemonic == "DB" else 2)
+            template = None
+        elif mnemonic == "DS":
+            if len(operands) not in (1, 2):
+                raise AssemblyError(F"line {number}: expected DS count[, fill]")
+            try:  # Everything after the DS depends on its size, so the count has to be known in this pass
+                size = evaluate(operands[0], labels, number)
+            except AssemblyError:
+                raise AssemblyError(F"line {number}: a DS count can only use numbers and labels defined above it") \
+                    from None
+            template = None
+        else:
+            template = next((template for template in TEMPLATES.get(mnemonic, ())
+                             if len(template.operands) == len(operands) and
+                             all(_matches(kind, operand) for kind, operand in zip(template.operands, operands))), None)
+            if template is None:
+                if mnemonic not in TEMPLATES:
+                    raise AssemblyError(F"line {number}: unknown instruction '{mnemonic}'")
+                forms = " or ".join(F"{mnemonic} {', '.join(t.operands)}".strip() for t in TEMPLATES[mnemonic])
+                raise AssemblyError(F"line {number}: expected {forms}")
+            size = 2
+        statements.append(Statement(number, address, mnemonic, template, operands))
+        address += size
+    return statements, labels
+
+
+def _value(kind, operand, labels, line):
+    if kind in ("Vx", "Vy"):
+        return int(REGISTER.match(operand).group(1), 16)
+    value = evaluate(operand, labels, line)
+    if not 0 <= value <= NUMBERS[kind]:
+        raise AssemblyError(F"line {line}: {operand} = {value} does not fit in a {kind}")
+    return value
+
+
+def _encode(statement, labels):
+    line = statement.line
+    if statement.mnemonic == "DB":
+        return bytes(_value("byte", operand, labels, line) for operand in statement.operands)
+    if statement.mnemonic == "DW":
+        words = [evaluate(operand, labels, line) for operand in statement.operands]
+        if any(not 0 <= word <= 0xFFFF for word in words):
+            raise AssemblyError(F"line {line}: word out of range")
+        return b"".join(word.to_bytes(2, "big") for word in words)
+    if statement.mnemonic == "DS":
+        fill = _value("byte", statement.operands[1], labels, line) if len(statement.operands) > 1 else 0
+        return bytes([fill]) * evaluate(statement.operands[0], labels, line)
+
+    template = statement.template
+    op_code = int(re.sub("[a-z]", "0", template.pattern), 16)
+    for kind, operand in zip(template.operands, statement.operands):
+        if kind in SHIFTS:
+            op_code |= _value(kind, operand, labels, line) << SHIFTS[kind]
+    if template.operands == ["Vx"] and "y" in template.pattern:  # SHR Vx / SHL Vx: shift Vx in place
+        op_code |= _value("Vx", statement.operands[0], labels, line) << SHIFTS["Vy"]
+    return op_code.to_bytes(2, "big")
+
+
+def assemble(source, origin=Interpreter.MEMORY_START_ADDRESS):
+    """Assemble source text into a ROM image, to be loaded at origin"""
+    statements, labels = _parse(source, origin)
+    rom = b"".join(_encode(statement, labels) for statement in statements)
+    if len(rom) > Interpreter.MEMORY_SIZE - origin:
+        raise AssemblyError(F"ROM of {len(rom)} bytes does not fit in memory")
+    return rom
+
+
+def assemble_file(path, output=None):
+    with open(path) as f:
+        try:
+            rom = assemble(f.read())
+        except AssemblyError as e:
+            raise AssemblyError(F"{path}: {e}") from None
+    output = output or os.path.splitext(path)[0] + ".ch8"
+    with open(output, "wb") as f:
+        f.write(rom)
+    return output
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Assemble CHIP-8 source into ROMs")
+    parser.add_argument("sources", nargs="+", metavar="SOURCE")
+    parser.add_argument("-o", "--output", help="Output path, when assembling a single source")
+    args = parser.parse_args()
+    if args.output and len(args.sources) > 1:
+        parser.error("--output only works with a single source")
+
+    for source in args.sources:
+        print(assemble_file(source, args.output))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+import sys
+import wave
+from array import array
+
+
+class Beeper:
+    """
+    Plays a square wave while the sound timer is running. The interpreter calls frame() once per 60 Hz timer tick, and
+    each call hands the sink one frame of samples sliced out of a tone buffer that is filled once up front, so nothing
+    is allocated while the emulator runs.
+    """
+    SAMPLE_RATE = 48000
+    FRAME_RATE = 60
+    FREQUENCY = 440
+    VOLUME = 0.25
+    SAMPLE_WIDTH = 2  # signed 16 bit mono
+
+    def __init__(self, sink, frequency=FREQUENCY, volume=VOLUME, sample_rate=SAMPLE_RATE):
+        assert sample_rate % Beeper.FRAME_RATE == 0, "A frame must be a whole number of samples"
+        self.sink = sink
+        self.sample_rate = sample_rate
+        self.frame_bytes = sample_rate // Beeper.FRAME_RATE * Beeper.SAMPLE_WIDTH
+
+        # One second of tone holds a whole number of periods, so reading it as a ring never clicks at the seam
+        amplitude = int(0x7FFF * volume)
+        half_period = sample_rate / (2 * frequency)
+        samples = array("h", (amplitude if int(i / half_period) % 2 == 0 else -amplitude for i in range(sample_rate)))
+        if sys.byteorder == "big":
+            samples.byteswap()
+        self.tone = memoryview(samples.tobytes())
+        self.silence = memoryview(bytes(self.frame_bytes))
+        self._position = 0
+
+        self.sink.open(self)
+
+    def frame(self, active):
+        if active:
+            position = self._position
+            self.sink.write(self.tone[position: position + self.frame_bytes], True)
+            self._position = (position + self.frame_bytes) % len(self.tone)
+        else:
+            self.sink.write(self.silence, False)
+            self._position = 0
+
+    def close(self):
+        self.sink.close()
+
+
+class NullSink:
+    """Discards audio, only counting frames. Used when running headless without a WAV file."""
+
+    def __init__(self):
+        self.frames = 0
+        self.active_frames = 0
+
+    def open(self, beeper):
+        pass
+
+    def write(self, samples, active):
+        self.frames += 1
+        self.active_frames += active
+
+    def close(self):
+        pass
+
+
+class WavSink:
+    """Streams every frame, tone or silence, into a WAV file so a headless run's audio can be checked afterwards."""
+
+    def __init__(self, path):
+        self.path = path
+        self._wav = None
+
+    def open(self, beeper):
+        self._wav = wave.open(self.path, "wb")
+        self._wav.setnchannels(1)
+        self._wav.setsampwidth(Beeper.SAMPLE_WIDTH)
+        self._wav.setframerate(beeper.sample_rate)
+
+    def write(self, samples, active):
+        self._wav.writeframesraw(samples)
+
+    def close(self):
+        if self._wav is not None:
+            self._wav.close()
+            self._wav = None
+
+
+class PygameSink:
+    """
+    Loops the beeper's tone on a pygame mixer channel and only starts or stops it when the sound timer toggles, so the
+    mixer does its own buffering and the emulation thread never waits on it.
+    """
+
+    def __init__(self):
+        self._sound = None
+        self._channel = None
+        self._playing = False
+
+    def open(self, beeper):
+        import pygame
+        mixer_format = (beeper.sample_rate, -8 * Beeper.SAMPLE_WIDTH, 1)
+        try:
+            if pygame.mixer.get_init() != mixer_format:
+                pygame.mixer.quit()  # pygame.init() may already have opened the mixer with its own format
+                pygame.mixer.init(*mixer_format)
+            self._sound = pygame.mixer.Sound(buffer=beeper.tone)
+        except pygame.error:
+            self._sound = None  # No audio device, run silently
+
+    def write(self, samples, active):
+        if active == self._playing or self._sound is None:
+            return
+        self._playing = active
+        if active:
+            self._channel = self._sound.play(loops=-1)
+        elif self._channel is not None:
+            self._channel.stop()
+
+    def close(self):
+        import pygame
+        if not pygame.mixer.get_init():  # Already shut down along with pygame, e.g. when the window was closed
+            return
+        if self._channel is not None:
+            self._channel.stop()
@@ -0,0 +1,9 @@
+# Static types for Core.py, read only by Cython when build_core.py compiles it. They make Core an extension type with
+# its state in C fields, and have no effect on the pure Python module. Every attribute Core sets must be declared here.
+
+cdef class Core:
+    cdef public object quirks, timing, audio, tracer, profiler, rom, _pristine_memory
+    cdef public long cycle_rate, cycles_per_frame, _frame_budget, _frame_countdown, frames
+    cdef public list memory, display, registers, stack, input
+    cdef public long program_counter, index_register, delay_timer, sound_timer, op_code
+    cdef public dict op_map, _op_map0, _op_map8, _op_mapE, _op_mapF
@@ -0,0 +1,590 @@
+from functools import update_wrapper
+from random import getrandbits
+from Quirks import get_profile, DEFAULT_PROFILE
+
+# The CHIP-8 machine itself: memory, registers, timers and the instruction set, without any window, keyboard or pygame.
+# Interpreter adds those on top. build_core.py compiles this same source with Cython into CompiledCore, which
+# Interpreter uses instead when it has been built, so this file sticks to Python that compiles unchanged: state lives
+# in the attributes declared in Core.pxd, and handlers are swapped in the dispatch maps rather than rebound on the
+# instance.
+
+
+class StackError(Exception):  # Raised with the program counter left on the CALL or RET that trapped
+    pass
+
+
+class StackOverflow(StackError):
+    pass
+
+
+class StackUnderflow(StackError):
+    pass
+
+
+class Core:
+    MEMORY_SIZE = 4096
+    MEMORY_START_ADDRESS = 0x200
+    FONT_SET_START_ADDRESS = 0x50
+    STACK_SIZE = 16
+    CHIP8_WIDTH = 64
+    CHIP8_HEIGHT = 32
+    TICKS_PER_FRAME = 10  # 600 Hz instruction clock, 60 Hz timers
+    INSTRUCTIONS_PER_SECOND = 600
+    BLANK_MEMORY = (0x00,) * MEMORY_SIZE
+    BLANK_DISPLAY = (0,) * (CHIP8_WIDTH * CHIP8_HEIGHT)
+
+    def __init__(self, rom_path=None, quirks=None, audio=None, rom=None, timing=None, tracer=None, profiler=None):
+        self.quirks = quirks or get_profile(DEFAULT_PROFILE)
+        self.timing = timing  # Timing model charging per-opcode cycle costs, or None for one cycle per instruction
+        if timing is None:
+            self.cycle_rate = Core.INSTRUCTIONS_PER_SECOND
+            self.cycles_per_frame = Core.TICKS_PER_FRAME
+            self._frame_budget = Core.TICKS_PER_FRAME
+        else:
+            self.cycle_rate = timing.cycle_rate
+            self.cycles_per_frame = timing.cycles_per_frame
+            self._frame_budget = timing.cycles_per_frame - timing.interrupt_cycles  # Cycles left to run instructions
+        self.audio = audio
+        self.tracer = tracer  # Tracer recording every instruction and memory access, see Tracer.py
+        self.profiler = profiler  # CallProfiler timing every subroutine, see Profiler.py
+        self.rom = b""
+        self._pristine_memory = None
+        self.memory = [0x00] * Core.MEMORY_SIZE
+        self.display = [0] * (Core.CHIP8_WIDTH * Core.CHIP8_HEIGHT)
+        if rom_path is not None:
+            self.load_rom(rom_path)
+        self.reset(rom)
+
+        self._op_map0 = {
+            0x0: self.OP_00E0,
+            0xE: self.OP_00EE
+        }
+
+        # Quirks are resolved here, once, so the handlers in the dispatch maps never need to check them
+        quirks = self.quirks
+        self._op_map8 = {
+            0x0: self.OP_8xy0,
+            0x1: self.OP_8xy1_vf if quirks.logic_resets_vf else self.OP_8xy1,
+            0x2: self.OP_8xy2_vf if quirks.logic_resets_vf else self.OP_8xy2,
+            0x3: self.OP_8xy3_vf if quirks.logic_resets_vf else self.OP_8xy3,
+            0x4: self.OP_8xy4,
+            0x5: self.OP_8xy5,
+            0x6: self.OP_8xy6_vy if quirks.shift_uses_vy else self.OP_8xy6,
+            0x7: self.OP_8xy7,
+            0xE: self.OP_8xyE_vy if quirks.shift_uses_vy else self.OP_8xyE
+        }
+
+        self._op_mapE = {
+            0xE: self.OP_Ex9E,
+            0x1: self.OP_ExA1
+        }
+
+        self._op_mapF = {
+            0x07: self.OP_Fx07,
+            0x0A: self.OP_Fx0A,
+            0x15: self.OP_Fx15,
+            0x18: self.OP_Fx18,
+            0x1E: self.OP_Fx1E,
+            0x29: self.OP_Fx29,
+            0x33: self.OP_Fx33,
+            0x55: self.OP_Fx55,
+            0x65: self.OP_Fx65
+        }
+
+        if quirks.load_store_increments_i:
+            self._op_mapF[0x55] = self.OP_Fx55_inc_x if quirks.load_store_i_by_x else self.OP_Fx55_inc
+            self._op_mapF[0x65] = self.OP_Fx65_inc_x if quirks.load_store_i_by_x else self.OP_Fx65_inc
+
+        self.op_map = {
+            0x0: self.__op_map0,
+            0x1: self.OP_1nnn,
+            0x2: self.OP_2nnn,
+            0x3: self.OP_3xkk,
+            0x4: self.OP_4xkk,
+            0x5: self.OP_5xy0,
+            0x6: self.OP_6xkk,
+            0x7: self.OP_7xkk,
+            0x8: self.__op_map8,
+            0x9: self.OP_9xy0,
+            0xA: self.OP_Annn,
+            0xB: self.OP_Bxnn if quirks.jump_uses_vx else self.OP_Bnnn,
+            0xC: self.OP_Cxkk,
+            0xD: self.OP_Dxyn_clip if quirks.clip_sprites else self.OP_Dxyn,
+            0xE: self.__op_mapE,
+            0xF: self.__op_mapF,
+        }
+
+        if timing is not None:
+            self.wrap_handlers(self._timed)
+        if tracer is not None:
+            tracer.attach(self)
+        if profiler is not None:
+            profiler.attach(self)
+
+    def wrap_handlers(self, wrap):  # Replace every opcode handler in the dispatch maps with wrap(handler)
+        for op_map in (self._op_map0, self._op_map8, self._op_mapE, self._op_mapF, self.op_map):
+            for key, handler in op_map.items():
+                if handler.__name__.startswith("OP_"):
+                    wrapped = wrap(handler)
+                    if wrapped is not handler:  # wrap() returns handlers it leaves alone as they are
+                        op_map[key] = update_wrapper(wrapped, handler)  # Keeps the OP_ name for the next wrapper
+
+    def _timed(self, handler):  # Wrap a handler so it also charges its cost from the timing model
+        timing = self.timing
+        pattern = handler.__name__[3:7]
+        cost = timing.costs[pattern] - 1  # step() charges the first cycle of every instruction
+
+        if pattern == "Dxyn":
+            if timing.draw_waits_for_vblank:
+                def timed():
+                    handler()
+                    # Spend the rest of this frame waiting for the interrupt, then draw at the start of the next one
+                    self._frame_countdown = -cost - timing.per_row * (self.op_code & 0x000F)
+            else:
+                def timed():
+                    handler()
+                    self._frame_countdown -= cost + timing.per_row * (self.op_code & 0x000F)
+        elif pattern in ("Fx55", "Fx65"):
+            def timed():
+                handler()
+                self._frame_countdown -= cost + timing.per_register * (((self.op_code & 0x0F00) >> 8) + 1)
+        else:
+            def timed():
+                handler()
+                self._frame_countdown -= cost
+        return timed
+
+    @property
+    def stack_pointer(self):  # Number of return addresses on the stack
+        return len(self.stack)
+
+    def __op_map0(self):
+        self._op_map0[self.op_code & 0x000F]()
+
+    def __op_map8(self):
+        self._op_map8[self.op_code & 0x000F]()
+
+    def __op_mapE(self):
+        self._op_mapE[self.op_code & 0x000F]()
+
+    def __op_mapF(self):
+        self._op_mapF[self.op_code & 0x00FF]()
+
+    def reset(self, rom=None):  # Return to the power-on state, optionally swapping in a new ROM image
+        if rom is not None:
+            self.rom = bytes(rom)
+            self._pristine_memory = None
+
+        if self._pristine_memory is None:
+            if len(self.rom) > Core.MEMORY_SIZE - Core.MEMORY_START_ADDRESS:
+                raise ValueError(F"ROM of {len(self.rom)} bytes does not fit in memory")
+            self.memory[:] = Core.BLANK_MEMORY
+            self.memory[Core.MEMORY_START_ADDRESS:Core.MEMORY_START_ADDRESS + len(self.rom)] = self.rom
+            self.load_fonts()
+            self._pristine_memory = self.memory[:]  # Every later reset of this ROM is a single copy of this image
+        else:
+            self.memory[:] = self._pristine_memory
+
+        self.registers = [0] * 16
+        self.index_register = 0
+        self.program_counter = Core.MEMORY_START_ADDRESS
+        self.stack = []  # Return addresses, up to STACK_SIZE of them
+        self.delay_timer = 0
+        self.sound_timer = 0
+        self._frame_countdown = self._frame_budget
+        self.frames = 0
+        self.input = [0] * 16
+        self.display[:] = Core.BLANK_DISPLAY
+        self.op_code = 0
+
+    def get_state(self):  # Everything needed to resume the machine later, as plain JSON friendly values
+        return {
+            "rom": self.rom.hex(),
+            "memory": bytes(self.memory).hex(),
+            "registers": self.registers[:],
+            "index_register": self.index_register,
+            "program_counter": self.program_counter,
+            "stack": self.stack[:],
+            "delay_timer": self.delay_timer,
+            "sound_timer": self.sound_timer,
+            "display": self.display[:],
+            "frames": self.frames,
+            "frame_countdown": self._frame_countdown,
+        }
+
+    def set_state(self, state):
+        rom = bytes.fromhex(state["rom"])
+        if rom != self.rom:
+            self.reset(rom)
+        self.memory[:] = bytes.fromhex(state["memory"])
+        self.registers = state["registers"][:]
+        self.index_register = state["index_register"]
+        if "program_counter" in state:
+            self.program_counter = state["program_counter"]
+            self.stack = state["stack"][:]
+        else:  # Saved when the program counter was the top of a fixed 16 entry stack
+            self.program_counter = state["stack"][state["stack_pointer"]]
+            self.stack = state["stack"][:state["stack_pointer"]]
+        self.delay_timer = state["delay_timer"]
+        self.sound_timer = state["sound_timer"]
+        self.display[:] = state["display"]
+        self.frames = state["frames"]
+        self._frame_countdown = state["frame_countdown"]
+
+    def load_rom(self, rom_path):  # Takes effect on the next reset()
+        with open(rom_path, "rb") as f:
+            self.rom = f.read()
+        self._pristine_memory = None
+
+    def load_fonts(self):
+        font_set = [
+            0xF0, 0x90, 0x90, 0x90, 0xF0,  # 0
+            0x20, 0x60, 0x20, 0x20, 0x70,  # 1
+            0xF0, 0x10, 0xF0, 0x80, 0xF0,  # 2
+            0xF0, 0x10, 0xF0, 0x10, 0xF0,  # 3
+            0x90, 0x90, 0xF0, 0x10, 0x10,  # 4
+            0xF0, 0x80, 0xF0, 0x10, 0xF0,  # 5
+            0xF0, 0x80, 0xF0, 0x90, 0xF0,  # 6
+            0xF0, 0x10, 0x20, 0x40, 0x40,  # 7
+            0xF0, 0x90, 0xF0, 0x90, 0xF0,  # 8
+            0xF0, 0x90, 0xF0, 0x10, 0xF0,  # 9
+            0xF0, 0x90, 0xF0, 0x90, 0x90,  # A
+            0xE0, 0x90, 0xE0, 0x90, 0xE0,  # B
+            0xF0, 0x80, 0x80, 0x80, 0xF0,  # C
+            0xE0, 0x90, 0x90, 0x90, 0xE0,  # D
+            0xF0, 0x80, 0xF0, 0x80, 0xF0,  # E
+            0xF0, 0x80, 0xF0, 0x80, 0x80  # F
+        ]
+        self.memory[Core.FONT_SET_START_ADDRESS: Core.FONT_SET_START_ADDRESS + len(font_set)] = font_set
+
+    @property
+    def cycles(self):  # Cycles since the last reset: instructions executed, unless there is a timing model
+        return self.frames * self.cycles_per_frame + self._frame_budget - self._frame_countdown
+
+    @property
+    def emulated_seconds(self):
+        return self.cycles / self.cycle_rate
+
+    def step(self):  # Execute one instruction, without throttling or polling input
+        pc = self.program_counter
+        self.op_code = (self.memory[pc] << 8) | self.memory[pc + 1]
+        self.program_counter = pc + 2
+
+        self.op_map[(self.op_code & 0xF000) >> 12]()
+
+        self._frame_countdown -= 1
+        while self._frame_countdown <= 0:
+            self._frame_countdown += self._frame_budget
+            self.update_timers()
+
+    def update_timers(self):  # Called at 60 Hz
+        self.frames += 1
+        if self.delay_timer > 0:
+            self.delay_timer -= 1
+
+        beeping = self.sound_timer > 0
+        if beeping:
+            self.sound_timer -= 1
+        if self.audio is not None:
+            self.audio.frame(beeping)
+
+    def increment_program_counter(self):
+        self.program_counter += 2
+
+    def decrement_program_counter(self):
+        self.program_counter -= 2
+
+    def OP_00E0(self):  # CLS: Clear the Display
+        self.display = [0] * (64 * 32)
+
+    def OP_00EE(self):  # RET: Return from a subroutine
+        try:
+            self.program_counter = self.stack.pop()
+        except IndexError:
+            self.decrement_program_counter()
+            raise StackUnderflow(F"RET at {self.program_counter:#05x} with an empty stack") from None
+
+    def OP_1nnn(self):  # JP addr: Jump to location nnn
+        self.program_counter = self.op_code & 0x0FFF
+
+    def OP_2nnn(self):  # CALL addr: Call subroutine at nnn
+        if len(self.stack) == Core.STACK_SIZE:
+            self.decrement_program_counter()
+            raise StackOverflow(F"CALL at {self.program_counter:#05x} with {Core.STACK_SIZE} calls already "
+                                F"on the stack")
+        self.stack.append(self.program_counter)
+        self.program_counter = self.op_code & 0x0FFF
+
+    def OP_3xkk(self):  # SE Vx, byte: Skip next instruction if Vx = kk
+        vx = (self.op_code & 0x0F00) >> 8
+
+        if self.registers[vx] == self.op_code & 0x00FF:
+            self.increment_program_counter()
+
+    def OP_4xkk(self):  # SNE Vx, byte: Skip next instruction if Vx != kk
+        vx = (self.op_code & 0x0F00) >> 8
+
+        if self.registers[vx] != self.op_code & 0x00FF:
+            self.increment_program_counter()
+
+    def OP_5xy0(self):  # SE Vx, Vy: Skip next instruction if Vx = Vy
+        vx = (self.op_code & 0x0F00) >> 8
+        vy = (self.op_code & 0x00F0) >> 4
+
+        if self.registers[vx] == self.registers[vy]:
+            self.increment_program_counter()
+
+    def OP_6xkk(self):  # LD Vx, byte: Set Vx = kk
+        vx = (self.op_code & 0x0F00) >> 8
+
+        self.registers[vx] = self.op_code & 0x00FF
+
+    def OP_7xkk(self):  # ADD Vx, byte: Set Vx = Vx + kk
+        vx = (self.op_code & 0x0F00) >> 8
+
+        self.registers[vx] = (self.registers[vx] + self.op_code & 0x00FF) % 0xFF
+
+    def OP_8xy0(self):  # LD Vx, Vy: Set Vx = Vy
+        vx = (self.op_code & 0x0F00) >> 8
+        vy = (self.op_code & 0x00F0) >> 4
+
+        self.registers[vx] = self.registers[vy]
+
+    def OP_8xy1(self):  # OR Vx, Vy: Set Vx = Vx OR Vy
+        vx = (self.op_code & 0x0F00) >> 8
+        vy = (self.op_code & 0x00F0) >> 4
+
+        self.registers[vx] |= self.registers[vy]
+
+    def OP_8xy2(self):  # AND Vx, Vy: Set Vx = Vx AND Vy
+        vx = (self.op_code & 0x0F00) >> 8
+        vy = (self.op_code & 0x00F0) >> 4
+
+        self.registers[vx] &= self.registers[vy]
+
+    def OP_8xy3(self):  # XOR Vx, Vy: Set Vx = Vx XOR Vy
+        vx = (self.op_code & 0x0F00) >> 8
+        vy = (self.op_code & 0x00F0) >> 4
+
+        self.registers[vx] ^= self.registers[vy]
+
+    def OP_8xy4(self):  # ADD Vx, Vy: Set Vx = Vx + Vy, set VF = carry
+        vx = (self.op_code & 0x0F00) >> 8
+        vy = (self.op_code & 0x00F0) >> 4
+
+        res = self.registers[vx] + self.registers[vy]
+        self.registers[0xF] = (0x100 & res) >> 8
+        self.registers[vx] = res & 0xFF
+
+    def OP_8xy5(self):  # SUB Vx, Vy: Set Vx = Vx - Vy, set VF = NOT borrow
+        vx = (self.op_code & 0x0F00) >> 8
+        vy = (self.op_code & 0x00F0) >> 4
+
+        self.registers[0xF] = int(self.registers[vx] > self.registers[vy])
+        self.registers[vx] -= self.registers[vy]
+        if self.registers[vx] < 0:
+            self.registers[vx] += 0xFF + 1
+
+    def OP_8xy6(self):  # SHR Vx {, Vy}: Set Vx = Vx SHR 1
+        vx = (self.op_code & 0x0F00) >> 8
+
+        self.registers[0xF] = self.registers[vx] & 1
+        self.registers[vx] >>= 1
+
+    def OP_8xy7(self):  # SUBN Vx, Vy: Set Vx = Vy - Vx, set VF = NOT borrow
+        vx = (self.op_code & 0x0F00) >> 8
+        vy = (self.op_code & 0x00F0) >> 4
+
+        self.registers[0xF] = int(self.registers[vy] > self.registers[vx])
+        self.registers[vx] = self.registers[vy] - self.registers[vx]
+        if self.registers[vx] < 0:
+            self.registers[vx] += 0xFF + 1
+
+    def OP_8xyE(self):  # SHL Vx {, Vy}: Set Vx = Vx SHL 1
+        vx = (self.op_code & 0x0F00) >> 8
+
+        self.registers[0xF] = (self.registers[vx] & 0x80) >> 7
+        self.registers[vx] <<= 1
+        if self.registers[0xF]:
+            self.registers[vx] -= (0xFF + 1)
+
+    def OP_9xy0(self):  # SNE Vx, Vy: Skip next instruction if Vx != Vy
+        vx = (self.op_code & 0x0F00) >> 8
+        vy = (self.op_code & 0x00F0) >> 4
+
+        if self.registers[vx] != self.registers[vy]:
+            self.increment_program_counter()
+
+    def OP_Annn(self):  # LD I, addr: Set I = nnn
+        self.index_register = self.op_code & 0x0FFF
+
+    def OP_Bnnn(self):  # P V0, addr: Jump to location nnn + V0
+        self.program_counter = (self.op_code & 0x0FFF) + self.registers[0]
+
+    def OP_Cxkk(self):  # RND Vx, byte: Set Vx = random byte AND kk
+        vx = (self.op_code & 0x0F00) >> 8
+        self.registers[vx] = getrandbits(8) & (self.op_code & 0x00FF)
+
+    def OP_Dxyn(self):  # DRW Vx, Vy, nibble: Display n-byte sprite starting at memory location I at (Vx, Vy), set VF = collision
+        vx = (self.op_code & 0x0F00) >> 8
+        vy = (self.op_code & 0x00F0) >> 4
+        height = self.op_code & 0x000F
+        width = 8
+        self.registers[0xF] = 0
+
+        for y in range(height):
+            byte = self.memory[self.index_register + y]
+            for x in range(width):
+
+                idx = byte & (0x80 >> x)
+                if not idx:
+                    continue
+
+                row = ((self.registers[vy]+y) % Core.CHIP8_HEIGHT) * Core.CHIP8_WIDTH
+                col = ((self.registers[vx] + x) % Core.CHIP8_WIDTH)
+
+                idx = row + col
+
+                if self.display[idx]:
+                    self.registers[0xF] = 1
+                self.display[idx] ^= 1
+
+                """
+                for i in range(32):
+                    [print(self.display[j + i * 64], end="", sep="") for j in range(64)]
+                    print()
+                print("\n")
+                """
+
+    def OP_Ex9E(self):  # SKP Vx: Skip next instruction if key with the value of Vx is pressed
+        vx = (self.op_code & 0x0F00) >> 8
+        if self.input[self.registers[vx]]:
+            self.increment_program_counter()
+
+    def OP_ExA1(self):  # SKNP Vx: Skip next instruction if key with the value of Vx is not pressed
+        vx = (self.op_code & 0x0F00) >> 8
+        if not self.input[self.registers[vx]]:
+            self.increment_program_counter()
+
+    def OP_Fx07(self):  # LD Vx, DT: Set Vx = delay timer value
+        vx = (self.op_code & 0x0F00) >> 8
+        self.registers[vx] = self.delay_timer
+
+    def OP_Fx0A(self):  # LD Vx, K: Wait for a key press, store the value of the key in Vx
+        vx = (self.op_code & 0x0F00) >> 8
+        for idx, n in enumerate(self.input):
+            if n:
+                self.registers[vx] = idx
+                return
+        self.decrement_program_counter()
+
+    def OP_Fx15(self):  # LD DT, Vx: Set delay timer = Vx
+        vx = (self.op_code & 0x0F00) >> 8
+        self.delay_timer = self.registers[vx]
+
+    def OP_Fx18(self):  # LD ST, Vx: Set sound timer = Vx
+        vx = (self.op_code & 0x0F00) >> 8
+        self.sound_timer = self.registers[vx]
+
+    def OP_Fx1E(self):  # ADD I, V: Set I = I + Vx
+        vx = (self.op_code & 0x0F00) >> 8
+        self.index_register += self.registers[vx]
+
+    def OP_Fx29(self):  # LD F, Vx: Set I = location of sprite for digit Vx
+        BYTES_PER_SPRITE = 5
+        vx = (self.op_code & 0x0F00) >> 8
+        self.index_register = Core.FONT_SET_START_ADDRESS + BYTES_PER_SPRITE * self.registers[vx]
+
+    def OP_Fx33(self):  # LD B, Vx: Store BCD representation of Vx in memory locations I, I+1, and I+2
+        vx = (self.op_code & 0x0F00) >> 8
+        val = self.registers[vx]
+        self.memory[self.index_register+2] = val % 10
+        val //= 10
+        self.memory[self.index_register+1] = val % 10
+        val //= 10
+        self.memory[self.index_register] = val % 10
+
+    def OP_Fx55(self):  # LD [I], Vx: Store registers V0 through Vx in memory starting at location I
+        vx = (self.op_code & 0x0F00) >> 8
+        for i in range(vx+1):
+            self.memory[self.index_register + i] = self.registers[i]
+
+    def OP_Fx65(self):  # LD Vx, [I]: Read registers V0 through Vx from memory starting at location I
+        vx = (self.op_code & 0x0F00) >> 8
+        for i in range(vx+1):
+            self.registers[i] = self.memory[self.index_register + i]
+
+    # Quirk variants. Only the one selected by the quirk profile is bound into the dispatch maps.
+
+    def OP_8xy1_vf(self):  # OR Vx, Vy: Set Vx = Vx OR Vy, set VF = 0
+        self.OP_8xy1()
+        self.registers[0xF] = 0
+
+    def OP_8xy2_vf(self):  # AND Vx, Vy: Set Vx = Vx AND Vy, set VF = 0
+        self.OP_8xy2()
+        self.registers[0xF] = 0
+
+    def OP_8xy3_vf(self):  # XOR Vx, Vy: Set Vx = Vx XOR Vy, set VF = 0
+        self.OP_8xy3()
+        self.registers[0xF] = 0
+
+    def OP_8xy6_vy(self):  # SHR Vx, Vy: Set Vx = Vy SHR 1
+        vx = (self.op_code & 0x0F00) >> 8
+        vy = (self.op_code & 0x00F0) >> 4
+
+        carry = self.registers[vy] & 1
+        self.registers[vx] = self.registers[vy] >> 1
+        self.registers[0xF] = carry
+
+    def OP_8xyE_vy(self):  # SHL Vx, Vy: Set Vx = Vy SHL 1
+        vx = (self.op_code & 0x0F00) >> 8
+        vy = (self.op_code & 0x00F0) >> 4
+
+        carry = (self.registers[vy] & 0x80) >> 7
+        self.registers[vx] = (self.registers[vy] << 1) & 0xFF
+        self.registers[0xF] = carry
+
+    def OP_Bxnn(self):  # JP Vx, addr: Jump to location xnn + Vx
+        vx = (self.op_code & 0x0F00) >> 8
+        self.program_counter = (self.op_code & 0x0FFF) + self.registers[vx]
+
+    def OP_Dxyn_clip(self):  # DRW Vx, Vy, nibble: As Dxyn, but pixels past the screen edges are clipped
+        vx = (self.op_code & 0x0F00) >> 8
+        vy = (self.op_code & 0x00F0) >> 4
+        height = self.op_code & 0x000F
+        width = 8
+        self.registers[0xF] = 0
+
+        # Only the starting position wraps; the rest of the sprite is cut off at the edges
+        start_x = self.registers[vx] % Core.CHIP8_WIDTH
+        start_y = self.registers[vy] % Core.CHIP8_HEIGHT
+        height = min(height, Core.CHIP8_HEIGHT - start_y)
+        width = min(width, Core.CHIP8_WIDTH - start_x)
+
+        for y in range(height):
+            byte = self.memory[self.index_register + y]
+            row = (start_y + y) * Core.CHIP8_WIDTH + start_x
+            for x in range(width):
+                if not byte & (0x80 >> x):
+                    continue
+
+                idx = row + x
+                if self.display[idx]:
+                    self.registers[0xF] = 1
+                self.display[idx] ^= 1
+
+    def OP_Fx55_inc(self):  # LD [I], Vx: As Fx55, then set I = I + x + 1
+        self.OP_Fx55()
+        self.index_register += ((self.op_code & 0x0F00) >> 8) + 1
+
+    def OP_Fx65_inc(self):  # LD Vx, [I]: As Fx65, then set I = I + x + 1
+        self.OP_Fx65()
+        self.index_register += ((self.op_code & 0x0F00) >> 8) + 1
+
+    def OP_Fx55_inc_x(self):  # LD [I], Vx: As Fx55, then set I = I + x
+        self.OP_Fx55()
+        self.index_register += (self.op_code & 0x0F00) >> 8
+
+    def OP_Fx65_inc_x(self):  # LD Vx, [I]: As Fx65, then set I = I + x
+        self.OP_Fx65()
+        self.index_register += (self.op_code & 0x0F00) >> 8
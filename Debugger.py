@@ -1,4 +1,5 @@
-from Interpreter import Interpreter
+from Interpreter import Interpreter, StackError
+from Opcodes import op_code_map
 import pygame
 from enum import Enum
 from time import sleep
@@ -14,15 +15,17 @@ class Debugger:
     def __init__(self, interpreter: Interpreter):
         self.interpreter = interpreter
         self.screen = interpreter._screen
-        self.x = Interpreter.SCREEN_WIDTH
+        self.x = interpreter.screen_width
         self.y = 0
         self.text_y_start = 0
         self.width = Interpreter.DEBUG_WINDOW_SIZE
-        self.height = Interpreter.SCREEN_HEIGHT
+        self.height = interpreter.screen_height
         self.font_size = 18
+        pygame.font.init()
         self.font = pygame.font.SysFont("monospace", self.font_size)
 
         self.state = STATE.PAUSE
+        self.error = None  # Why the interpreter last trapped, shown until it runs again
         self.pause = None
         self.step = None
         self.play = None
@@ -34,7 +37,14 @@ class Debugger:
             if self.state == STATE.PAUSE:
                 sleep(0.05)
             else:
-                self.interpreter.tick()
+                self.error = None
+                try:
+                    self.interpreter.tick()
+                except StackError as e:  # Stop on the CALL or RET that trapped, and show why
+                    self.error = F"{type(e).__name__} at {hex(self.interpreter.program_counter)}"
+                    self.state = STATE.PAUSE
+                # Show every step, not only complete frames. tick() has already presented a frame that ended
+                self.interpreter.update_screen(decay=False)
             if self.state == STATE.STEP:
                 self.state = STATE.PAUSE
             self.draw()
@@ -100,6 +110,10 @@ class Debugger:
         gt = self.font.render(">", True, GREEN)
         self.screen.blit(gt, (self.play.centerx - gt.get_size()[0] // 2, self.play.centery - gt.get_size()[1] // 2))
 
+        if self.error:
+            img = self.font.render(self.error, True, RED)
+            self.screen.blit(img, (self.play.right + buffer, self.play.centery - img.get_size()[1] // 2))
+
         current_y = self.text_y_start
 
         for i, line in enumerate(formatted.split("\n")):
@@ -111,11 +125,13 @@ class Debugger:
         self.screen.blit(line, (self.x + buffer, self.y + current_y))
         current_y += buffer + self.font_size
 
-        for i, line in enumerate(reversed(self.interpreter.stack)):
+        stack = self.interpreter.stack
+        for i in reversed(range(Interpreter.STACK_SIZE)):
             color = WHITE
-            if self.interpreter.stack_pointer == 0xF - i:
+            if i == len(stack) - 1:
                 color = GREEN
-            img = self.font.render(F"{hex(0xF - i)[2:]}. |{hex(line)}|", True, color)
+            address = hex(stack[i]) if i < len(stack) else "-----"
+            img = self.font.render(F"{hex(i)[2:]}. |{address}|", True, color)
             self.screen.blit(img, (self.x + buffer, self.y + current_y))
             current_y += (buffer + self.font_size)
 
@@ -158,44 +174,6 @@ R6:{} RE:{} |
 R7:{} RF:{} |
 """
 
-op_code_map = {
-    "0nnn": "SYS addr",
-    "00E0": "CLS",
-    "00EE": "RET",
-    "1nnn": "JP addr",
-    "2nnn": "CALL addr",
-    "3xkk": "SE Vx, byte",
-    "4xkk": "SNE Vx, byte",
-    "5xy0": "SE Vx, Vy",
-    "6xkk": "LD Vx, byte",
-    "7xkk": "ADD Vx, byte",
-    "8xy0": "LD Vx, Vy",
-    "8xy1": "OR Vx, Vy",
-    "8xy2": "AND Vx, Vy",
-    "8xy3": "XOR Vx, Vy",
-    "8xy4": "ADD Vx, Vy",
-    "8xy5": "SUB Vx, Vy",
-    "8xy6": "SHR Vx {, Vy}",
-    "8xy7": "SUBN Vx, Vy",
-    "8xyE": "SHL Vx {, Vy}",
-    "9xy0": "SNE Vx, Vy",
-    "Annn": "LD I, addr",
-    "Bnnn": "JP V0, addr",
-    "Cxkk": "RND Vx, byte",
-    "Dxyn": "DRW Vx, Vy, nibble",
-    "Ex9E": "SKP Vx",
-    "ExA1": "SKNP Vx",
-    "Fx07": "LD Vx, DT",
-    "Fx0A": "LD Vx, K",
-    "Fx15": "LD DT, Vx",
-    "Fx18": "LD ST, Vx",
-    "Fx1E": "ADD I, Vx",
-    "Fx29": "LD F, Vx",
-    "Fx33": "LD B, Vx",
-    "Fx55": "LD [I], Vx",
-    "Fx65": "LD Vx, [I]",
-}
-
 _op_map0 = {
     0x0: "OP_00E0",
     0xE: "OP_00EE"
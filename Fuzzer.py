@@ -0,0 +1,199 @@
+import argparse
+import os
+import random
+from time import perf_counter
+from Interpreter import Interpreter
+from Quirks import get_profile, DEFAULT_PROFILE
+
+MAX_ROM_SIZE = Interpreter.MEMORY_SIZE - Interpreter.MEMORY_START_ADDRESS
+
+# Masks that reduce an op code to the instruction it decodes to, e.g. 0x8AB4 -> 0x8004 (ADD Vx, Vy)
+OPCODE_MASKS = [0xF0FF, 0xF000, 0xF000, 0xF000, 0xF000, 0xF00F, 0xF000, 0xF000,
+                0xF00F, 0xF00F, 0xF000, 0xF000, 0xF000, 0xF000, 0xF0FF, 0xF0FF]
+
+# Op codes worth splicing into a ROM: every instruction with its operands zeroed
+INTERESTING_OPCODES = [0x00E0, 0x00EE, 0x1000, 0x2000, 0x3000, 0x4000, 0x5000, 0x6000, 0x7000, 0x8000, 0x8001,
+                       0x8002, 0x8003, 0x8004, 0x8005, 0x8006, 0x8007, 0x800E, 0x9000, 0xA000, 0xB000, 0xC000,
+                       0xD000, 0xE09E, 0xE0A1, 0xF007, 0xF00A, 0xF015, 0xF018, 0xF01E, 0xF029, 0xF033, 0xF055, 0xF065]
+
+
+class Fuzzer:
+    """
+    Coverage guided fuzzer for ROMs and key input. Each execution takes an entry from the corpus, mutates its ROM and
+    its input stream (one 16 bit key mask per frame), and runs it on a reused headless Interpreter for a fixed budget of
+    instructions. Inputs that reach a new PC or a new instruction are added to the corpus, and inputs that raise are
+    saved to the output directory once per (error, PC) pair. RND draws from the global random module, which is seeded
+    from the fuzzer's own generator before every execution, so a crash is reproduced by its ROM, keys and that seed.
+    """
+
+    def __init__(self, seeds, output_dir=None, cycles=2000, quirks=None, seed=None):
+        if not seeds:
+            raise ValueError("The fuzzer needs at least one seed ROM")
+        self.output_dir = output_dir
+        self.cycles = cycles
+        self.random = random.Random(seed)
+        self.corpus = [(bytes(rom[:MAX_ROM_SIZE]), [0]) for rom in seeds]
+        self.vm = Interpreter(None, False, quirks, headless=True, rom=self.corpus[0][0])
+
+        self.pcs_seen = bytearray(Interpreter.MEMORY_SIZE)
+        self.opcodes_seen = bytearray(0x10000)
+        self.crashes = {}
+        self.executions = 0
+        self.elapsed = 0.0
+
+    @property
+    def pc_coverage(self):
+        return sum(self.pcs_seen)
+
+    @property
+    def opcode_coverage(self):
+        return sum(self.opcodes_seen)
+
+    @property
+    def executions_per_second(self):
+        return self.executions / self.elapsed if self.elapsed else 0.0
+
+    def run(self, executions=None, seconds=None):
+        start = perf_counter()
+        deadline = start + seconds if seconds is not None else None
+        done = 0
+        if not self.executions:  # Run the seeds as they are first so their coverage is the baseline
+            for rom, keys in list(self.corpus):
+                self.execute(rom, keys, add_to_corpus=False)
+            done = len(self.corpus)
+
+        while (executions is None or done < executions) and (deadline is None or perf_counter() < deadline):
+            rom, keys = self.random.choice(self.corpus)
+            self.execute(self.mutate_rom(rom), self.mutate_keys(keys))
+            done += 1
+        self.elapsed += perf_counter() - start
+        return self.stats()
+
+    def execute(self, rom, keys, add_to_corpus=True, rnd_seed=None):
+        if rnd_seed is None:
+            rnd_seed = self.random.getrandbits(32)
+        random.seed(rnd_seed)
+        vm = self.vm
+        vm.reset(rom)
+        pcs_seen = self.pcs_seen
+        opcodes_seen = self.opcodes_seen
+        new_coverage = False
+        pc = vm.program_counter
+
+        try:
+            for cycle in range(self.cycles):
+                if not cycle % Interpreter.TICKS_PER_FRAME:
+                    mask = keys[(cycle // Interpreter.TICKS_PER_FRAME) % len(keys)]
+                    vm.input = [(mask >> key) & 1 for key in range(16)]
+
+                pc = vm.program_counter
+                if not pcs_seen[pc]:
+                    pcs_seen[pc] = 1
+                    new_coverage = True
+
+                vm.step()
+
+                op_code = vm.op_code & OPCODE_MASKS[vm.op_code >> 12]
+                if not opcodes_seen[op_code]:
+                    opcodes_seen[op_code] = 1
+                    new_coverage = True
+        except Exception as e:
+            self.save_crash(type(e).__name__, pc, rom, keys, rnd_seed)
+        finally:
+            self.executions += 1
+
+        if new_coverage and add_to_corpus:
+            self.corpus.append((rom, keys))
+        return new_coverage
+
+    def save_crash(self, error, pc, rom, keys, rnd_seed):
+        if (error, pc) in self.crashes:
+            return
+        self.crashes[(error, pc)] = (rom, keys, rnd_seed)
+        if self.output_dir is None:
+            return
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        name = os.path.join(self.output_dir, F"crash-{error}-{pc:03x}")
+        with open(name + ".ch8", "wb") as file:
+            file.write(rom)
+        with open(name + ".keys", "w") as file:
+            file.write("\n".join(F"{mask:04x}" for mask in keys))
+        with open(name + ".seed", "w") as file:  # For random.seed() before replaying it
+            file.write(str(rnd_seed))
+
+    def mutate_rom(self, rom):
+        rng = self.random
+        rom = bytearray(rom) or bytearray(2)
+        for _ in range(rng.randint(1, 4)):
+            choice = rng.randrange(6)
+            pos = rng.randrange(len(rom))
+            if choice == 0:  # Flip a bit
+                rom[pos] ^= 1 << rng.randrange(8)
+            elif choice == 1:  # Random byte
+                rom[pos] = rng.randrange(256)
+            elif choice == 2:  # Insert a byte
+                rom.insert(pos, rng.randrange(256))
+            elif choice == 3 and len(rom) > 2:  # Delete a byte
+                del rom[pos]
+            elif choice == 4:  # Overwrite an instruction with a random operand version of a known op code
+                pos &= ~1
+                rom[pos:pos + 2] = self.random_opcode().to_bytes(2, "big")
+            else:  # Splice in part of another corpus entry
+                other = rng.choice(self.corpus)[0]
+                if other:
+                    start = rng.randrange(len(other))
+                    rom[pos:pos + rng.randint(1, 16)] = other[start:start + rng.randint(1, 16)]
+        return bytes(rom[:MAX_ROM_SIZE])
+
+    def random_opcode(self):  # A known instruction with random operands, leaving the bits that decode it alone
+        op_code = self.random.choice(INTERESTING_OPCODES)
+        return op_code | (self.random.randrange(0x1000) & ~OPCODE_MASKS[op_code >> 12])
+
+    def mutate_keys(self, keys):
+        rng = self.random
+        keys = list(keys)
+        choice = rng.randrange(3)
+        if choice == 0:  # Toggle a key on one frame
+            keys[rng.randrange(len(keys))] ^= 1 << rng.randrange(16)
+        elif choice == 1:  # Hold the last frame's keys for another frame
+            keys.append(keys[-1])
+        elif len(keys) > 1:  # Drop a frame
+            del keys[rng.randrange(len(keys))]
+        return keys
+
+    def stats(self):
+        return {
+            "executions": self.executions,
+            "executions_per_second": round(self.executions_per_second, 1),
+            "corpus": len(self.corpus),
+            "pc_coverage": self.pc_coverage,
+            "opcode_coverage": self.opcode_coverage,
+            "crashes": len(self.crashes),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Coverage guided ROM fuzzer for ChiPy-8")
+    parser.add_argument("seeds", nargs="*", help="Seed ROMs. Defaults to every ROM in Roms/")
+    parser.add_argument("--seconds", type=float, default=60, help="How long to fuzz for")
+    parser.add_argument("--cycles", type=int, default=2000, help="Instruction budget per execution")
+    parser.add_argument("--out", default="crashes", help="Directory crashing ROMs and key streams are saved to")
+    parser.add_argument("--quirks", default=DEFAULT_PROFILE, help="Quirk profile to run the ROMs with")
+    parser.add_argument("--seed", type=int, help="Random seed, for reproducible runs")
+    args = parser.parse_args()
+
+    paths = args.seeds or [os.path.join("Roms", name) for name in sorted(os.listdir("Roms"))]
+    seeds = []
+    for path in paths:
+        with open(path, "rb") as file:
+            seeds.append(file.read())
+
+    fuzzer = Fuzzer(seeds, args.out, args.cycles, get_profile(args.quirks), args.seed)
+    print(fuzzer.run(seconds=args.seconds))
+    for error, pc in sorted(fuzzer.crashes):
+        print(F"{error} at {hex(pc)}")
+
+
+if __name__ == '__main__':
+    main()
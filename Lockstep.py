@@ -0,0 +1,181 @@
+import argparse
+import random
+import sys
+from collections import namedtuple
+from Interpreter import Interpreter
+from Quirks import get_profile, profile_for_rom, PROFILES
+from ScriptedInput import ScriptedInput
+from Timing import get_timing, TIMINGS
+from Tracer import ACCESSES, WRITE
+
+# The state compared after every instruction. Memory and the framebuffer are only compared once per frame
+CPU_STATE = ("program_counter", "registers", "index_register", "stack_pointer", "stack", "delay_timer", "sound_timer",
+             "frames")
+# Counted in emulated time, so left out when the two machines run under different timing models
+TIMED_STATE = ("delay_timer", "sound_timer", "frames")
+
+MEMORY_WRITES = {pattern: length for pattern, (kind, length) in ACCESSES.items() if kind == WRITE}
+DISPLAY_WRITES = ("00E0", "Dxyn")
+
+# instruction: how many instructions both machines had executed when they diverged, counting the one that diverged
+Divergence = namedtuple("Divergence", ["instruction", "frame", "differences"])
+
+
+def cpu_state(interpreter, names=CPU_STATE):
+    return tuple(getattr(interpreter, name) for name in names)
+
+
+def differences(a, b, names=CPU_STATE):
+    """Describe every way two machines differ, or return an empty list if they are identical"""
+    found = []
+    for name in names:
+        value_a, value_b = getattr(a, name), getattr(b, name)
+        if name == "registers":
+            found += [F"V{idx:X}: {x:#04x} != {y:#04x}" for idx, (x, y) in enumerate(zip(value_a, value_b)) if x != y]
+        elif value_a != value_b:
+            found.append(F"{name}: {value_a} != {value_b}")
+    found += [F"memory[{address:#05x}]: {x:#04x} != {y:#04x}"
+              for address, (x, y) in enumerate(zip(a.memory, b.memory)) if x != y]
+    found += [F"display ({idx % Interpreter.CHIP8_WIDTH}, {idx // Interpreter.CHIP8_WIDTH}): {x} != {y}"
+              for idx, (x, y) in enumerate(zip(a.display, b.display)) if x != y]
+    return found
+
+
+class Lockstep:
+    """
+    Runs two headless Interpreters side by side, one instruction at a time, and finds the first instruction after which
+    they differ: e.g. a reference and an optimised implementation, or one ROM under two quirk profiles.
+
+    The registers, I, PC, stack and timers are compared after every instruction. Memory and the framebuffer are
+    compared once per frame, and only where either machine wrote since the last comparison: the handlers of the
+    instructions that write them are wrapped to note the range. When anything differs, both machines are rewound to the
+    snapshot taken at the start of the frame and replayed with a full comparison after every instruction, to pin down
+    where they first diverged. Both machines draw the same random numbers, and follow the same ScriptedInput if one is
+    given. Under two different timing models the timers and frame count are not compared.
+    """
+
+    def __init__(self, a, b, script=None):
+        self.a = a
+        self.b = b
+        self.script = script
+        self.instructions = 0
+        self.errors = (None, None)
+        self.state = CPU_STATE if a.timing == b.timing else tuple(n for n in CPU_STATE if n not in TIMED_STATE)
+        self._memory_writes = [(0, len(a.memory))]  # (start, length) since the last comparison; all of it at first
+        self._display_written = True
+        for interpreter in (a, b):
+            interpreter.wrap_handlers(self._tracker(interpreter))
+
+    def _tracker(self, interpreter):
+        def wrap(handler):
+            pattern = handler.__name__[3:7]
+            if pattern in MEMORY_WRITES:
+                length = MEMORY_WRITES[pattern]
+
+                def tracked():
+                    self._memory_writes.append((interpreter.index_register, length(interpreter.op_code)))
+                    handler()
+                return tracked
+            if pattern in DISPLAY_WRITES:
+                def tracked():
+                    self._display_written = True
+                    handler()
+                return tracked
+            return handler
+        return wrap
+
+    def written_state_matches(self):  # Compare the memory and framebuffer written since the last call
+        a, b = self.a, self.b
+        matches = not self._display_written or a.display == b.display
+        matches = matches and all(a.memory[start:start + length] == b.memory[start:start + length]
+                                  for start, length in self._memory_writes)
+        self._memory_writes.clear()
+        self._display_written = False
+        return matches
+
+    def step(self):  # Returns False if either machine raised, with the errors kept in self.errors
+        a, b = self.a, self.b
+        random_state = None
+        if a.memory[a.program_counter] >> 4 == 0xC or b.memory[b.program_counter] >> 4 == 0xC:
+            random_state = random.getstate()  # RND is next, so let both machines draw the same number
+
+        errors = [None, None]
+        for idx, interpreter in enumerate((a, b)):
+            if self.script is not None:
+                self.script.apply(interpreter, interpreter.frames)
+            if idx and random_state is not None:
+                random.setstate(random_state)
+            try:
+                interpreter.step()
+            except Exception as e:
+                errors[idx] = type(e).__name__
+
+        self.instructions += 1
+        self.errors = tuple(errors)
+        return errors == [None, None]
+
+    def run(self, frames):
+        """Run until frame `frames` of the first machine, returning the first Divergence, or None if there was none"""
+        while self.a.frames < frames:
+            snapshot = (self.a.get_state(), self.b.get_state(), random.getstate(), self.instructions)
+            frame = self.a.frames
+            while self.a.frames == frame:
+                if not self.step() or cpu_state(self.a, self.state) != cpu_state(self.b, self.state):
+                    break
+            else:
+                if self.written_state_matches():
+                    continue
+
+            if self.errors[0] == self.errors[1] and not differences(self.a, self.b, self.state):
+                return None  # Both raised the same error in the same state, so neither can go on
+            return self.replay(*snapshot)
+        return None
+
+    def replay(self, state_a, state_b, random_state, instructions):  # Find the exact instruction that diverged
+        self.a.set_state(state_a)
+        self.b.set_state(state_b)
+        random.setstate(random_state)
+        self.instructions = instructions
+        while True:
+            ok = self.step()
+            found = differences(self.a, self.b, self.state)
+            if self.errors[0] != self.errors[1]:
+                found.insert(0, F"error: {self.errors[0]} != {self.errors[1]}")
+            if found or not ok:
+                return Divergence(self.instructions, self.a.frames, found) if found else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a ROM on two headless interpreters in lockstep and report the "
+                                                 "first instruction where they diverge")
+    parser.add_argument("rom")
+    parser.add_argument("--frames", type=int, default=600, help="How many frames to compare")
+    parser.add_argument("--quirks", nargs=2, choices=sorted(PROFILES), metavar=("A", "B"),
+                        help="Quirk profiles of the two machines. Both default to the ROM's own profile")
+    parser.add_argument("--timing", nargs=2, choices=sorted(TIMINGS) + ["none"], metavar=("A", "B"),
+                        help="Timing models of the two machines. Both default to none")
+    parser.add_argument("--input", metavar="FILE", help="Scripted key presses, one 'start end key' per line")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    args = parser.parse_args()
+
+    machines = []
+    for idx in range(2):
+        quirks = get_profile(args.quirks[idx]) if args.quirks else profile_for_rom(args.rom)
+        timing = get_timing(args.timing[idx]) if args.timing and args.timing[idx] != "none" else None
+        machines.append(Interpreter(args.rom, False, quirks, headless=True, timing=timing))
+
+    random.seed(args.seed)
+    script = ScriptedInput.from_file(args.input) if args.input else None
+    divergence = Lockstep(*machines, script).run(args.frames)
+    if divergence is None:
+        print(F"No divergence in {args.frames} frames")
+        return
+
+    print(F"Diverged at instruction {divergence.instruction}, frame {divergence.frame}:")
+    for difference in divergence.differences:
+        print(F"  {difference}")
+    sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,387 @@
+"""
+Netplay: one headless Interpreter streamed over TCP to any number of clients, who can all watch and press keys.
+
+After every 60 Hz frame the server sends each client a fixed header and the framebuffer delta:
+
+FRAME   frame number, sequence of the client's last key state used for the frame, delay timer, sound timer, length
+        of the delta, then the delta: the framebuffer packed 8 pixels to a byte, XORed with the previous frame sent
+        and run-length encoded with PackBits. A client's first frame is relative to a blank screen.
+
+Clients send their whole key state whenever it changes:
+
+KEYS    sequence number, bitmask of the 16 keys held
+
+The keys the machine sees are those held by any client, so spectators simply never send any. A frame where nothing
+was drawn costs the header and 4 bytes of delta, and the sequence lets a client time from pressing a key to seeing
+the first frame that ran with it.
+
+python3 Netplay.py serve PONG --port 8008     serve a ROM
+python3 Netplay.py connect localhost:8008     play it in a window, --spectate to only watch
+"""
+import argparse
+import selectors
+import socket
+import struct
+import sys
+from statistics import median
+from time import perf_counter
+from Interpreter import Interpreter, init_pygame
+
+FRAME = struct.Struct("<IIBBH")
+KEYS = struct.Struct("<IH")
+PORT = 8008
+FRAME_RATE = 60
+PIXELS = Interpreter.CHIP8_WIDTH * Interpreter.CHIP8_HEIGHT
+PACKED_SIZE = PIXELS // 8
+BITS = bytes.maketrans(b"\x00\x01", b"01")
+
+
+def pack(display):  # The framebuffer as one int, a bit per pixel, so a delta is a single XOR
+    return int(bytes(display).translate(BITS), 2)
+
+
+def unpack(screen):
+    return [int(bit) for bit in format(screen, F"0{PIXELS}b")]
+
+
+def rle_encode(data):  # PackBits: runs of 2 to 129 equal bytes, and everything else as literals
+    encoded = bytearray()
+    literals = bytearray()
+    idx = 0
+    while idx < len(data):
+        run = 1
+        while run < 129 and idx + run < len(data) and data[idx + run] == data[idx]:
+            run += 1
+        if run > 1 or len(literals) == 128:
+            if literals:
+                encoded += bytes((len(literals) - 1,)) + literals
+                literals = bytearray()
+        if run > 1:
+            encoded += bytes((run + 126, data[idx]))
+        else:
+            literals.append(data[idx])
+        idx += run
+    if literals:
+        encoded += bytes((len(literals) - 1,)) + literals
+    return bytes(encoded)
+
+
+def rle_decode(data):
+    decoded = bytearray()
+    idx = 0
+    while idx < len(data):
+        header = data[idx]
+        if header < 128:  # header + 1 literal bytes
+            decoded += data[idx + 1: idx + header + 2]
+            idx += header + 2
+        else:  # The next byte, header - 126 times
+            decoded += bytes((data[idx + 1],)) * (header - 126)
+            idx += 2
+    return bytes(decoded)
+
+
+def encode_delta(previous, screen):
+    return rle_encode((previous ^ screen).to_bytes(PACKED_SIZE, "big"))
+
+
+def decode_delta(previous, delta):
+    return previous ^ int.from_bytes(rle_decode(delta), "big")
+
+
+def keys_mask(keys):
+    return sum(1 << key for key, held in enumerate(keys) if held)
+
+
+class _Connection:
+    def __init__(self, sock):
+        self.sock = sock
+        self.inbox = bytearray()
+        self.outbox = bytearray()
+        self.keys = 0
+        self.sequence = 0  # Of the last key state received, echoed in every FRAME
+        self.screen = 0  # Packed framebuffer the client has, blank until its first frame
+
+
+class NetplayServer:
+    """
+    Serves a headless Interpreter to every client that connects. The server is single threaded: frame() accepts new
+    clients, reads their keys, runs the machine for one frame and sends the delta, without ever blocking on a client.
+    A client that falls more than MAX_BACKLOG bytes behind is disconnected rather than slowing everyone else down.
+    """
+    MAX_BACKLOG = 1 << 16
+
+    def __init__(self, interpreter, host="127.0.0.1", port=PORT):
+        self.interpreter = interpreter
+        self.listener = socket.create_server((host, port))
+        self.listener.setblocking(False)
+        self.address = self.listener.getsockname()
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.listener, selectors.EVENT_READ)
+        self.connections = {}  # socket -> _Connection
+        self.bytes_sent = 0
+        self.frames_sent = 0  # Counted once per client
+
+    def poll(self, timeout=0):
+        """Accept clients and read their keys, waiting up to timeout seconds for the first event"""
+        for key, _ in self.selector.select(timeout):
+            if key.fileobj is self.listener:
+                self.accept()
+            else:
+                self.receive(self.connections[key.fileobj])
+
+    def accept(self):
+        try:
+            sock, _ = self.listener.accept()
+        except BlockingIOError:
+            return
+        sock.setblocking(False)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)  # Frames are small and late ones are useless
+        self.connections[sock] = _Connection(sock)
+        self.selector.register(sock, selectors.EVENT_READ)
+
+    def receive(self, connection):
+        try:
+            data = connection.sock.recv(4096)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            data = b""
+        if not data:
+            self.disconnect(connection)
+            return
+        connection.inbox += data
+        while len(connection.inbox) >= KEYS.size:  # Only the latest key state matters
+            connection.sequence, connection.keys = KEYS.unpack_from(connection.inbox)
+            del connection.inbox[:KEYS.size]
+
+    def disconnect(self, connection):
+        self.selector.unregister(connection.sock)
+        connection.sock.close()
+        del self.connections[connection.sock]
+
+    def keys(self):
+        held = 0
+        for connection in self.connections.values():
+            held |= connection.keys
+        return [held >> key & 1 for key in range(16)]
+
+    def frame(self):
+        """Run the machine for one frame on the keys the clients hold, and send every client the result"""
+        self.poll()
+        interpreter = self.interpreter
+        if interpreter.script is not None:
+            interpreter.script.apply(interpreter, interpreter.frames)
+        else:
+            interpreter.input = self.keys()
+        frame = interpreter.frames
+        while interpreter.frames == frame:
+            interpreter.step()
+        self.broadcast()
+
+    def broadcast(self):
+        interpreter = self.interpreter
+        screen = pack(interpreter.display)
+        deltas = {}  # Clients are normally all on the same screen, so the delta is encoded once
+        for connection in list(self.connections.values()):
+            if connection.screen not in deltas:
+                deltas[connection.screen] = encode_delta(connection.screen, screen)
+            delta = deltas[connection.screen]
+            message = FRAME.pack(interpreter.frames, connection.sequence, interpreter.delay_timer,
+                                 interpreter.sound_timer, len(delta)) + delta
+            connection.outbox += message
+            connection.screen = screen
+            self.bytes_sent += len(message)
+            self.frames_sent += 1
+            self.flush(connection)
+
+    def flush(self, connection):
+        try:
+            sent = connection.sock.send(connection.outbox)
+        except (BlockingIOError, InterruptedError):
+            sent = 0
+        except OSError:
+            self.disconnect(connection)
+            return
+        del connection.outbox[:sent]
+        if len(connection.outbox) > NetplayServer.MAX_BACKLOG:
+            self.disconnect(connection)
+
+    def serve(self, frames=None, frame_rate=FRAME_RATE):
+        """Serve frames (or forever) at frame_rate, 0 for as fast as possible, waiting on clients between frames"""
+        deadline = perf_counter()
+        while frames is None or self.interpreter.frames < frames:
+            if frame_rate:
+                deadline += 1 / frame_rate
+                while True:
+                    remaining = deadline - perf_counter()
+                    if remaining <= 0:
+                        break
+                    self.poll(remaining)
+            self.frame()
+
+    def close(self):
+        for connection in list(self.connections.values()):
+            self.disconnect(connection)
+        self.selector.unregister(self.listener)
+        self.listener.close()
+        self.selector.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+
+class NetplayClient:
+    """
+    Follows a NetplayServer: receive() reads the next frame into display, delay_timer and sound_timer. Every frame's
+    size is added to bytes_received, and the time from send_keys() to the first frame that ran with those keys is
+    appended to latencies.
+    """
+
+    def __init__(self, host="127.0.0.1", port=PORT, timeout=5):
+        self.sock = socket.create_connection((host, port), timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.screen = 0
+        self.display = [0] * PIXELS
+        self.frame = 0
+        self.delay_timer = 0
+        self.sound_timer = 0
+        self.frames_received = 0
+        self.bytes_received = 0
+        self.latencies = []  # Seconds
+        self.keys = [0] * 16
+        self._sequence = 0
+        self._sent = {}  # sequence -> time sent, until a frame uses those keys
+        self._buffer = bytearray()
+
+    def send_keys(self, keys):
+        self.keys = list(keys)
+        self._sequence += 1
+        self._sent[self._sequence] = perf_counter()
+        self.sock.sendall(KEYS.pack(self._sequence, keys_mask(keys)))
+
+    def _read(self, size):
+        while len(self._buffer) < size:
+            data = self.sock.recv(4096)
+            if not data:
+                raise ConnectionError("the server closed the connection")
+            self._buffer += data
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+    def receive(self):
+        """Wait for the next frame and apply it. Returns its frame number"""
+        self.frame, sequence, self.delay_timer, self.sound_timer, length = FRAME.unpack(self._read(FRAME.size))
+        delta = self._read(length)
+        self.screen = decode_delta(self.screen, delta)
+        self.display = unpack(self.screen)
+        self.frames_received += 1
+        self.bytes_received += FRAME.size + length
+
+        now = perf_counter()
+        for acknowledged in [s for s in self._sent if s <= sequence]:
+            self.latencies.append(now - self._sent.pop(acknowledged))
+        return self.frame
+
+    @property
+    def bytes_per_frame(self):
+        return self.bytes_received / self.frames_received if self.frames_received else 0
+
+    def stats(self):
+        latency = F", median key to frame latency {median(self.latencies) * 1000:.1f} ms" if self.latencies else ""
+        return F"{self.frames_received} frames, {self.bytes_per_frame:.1f} bytes/frame{latency}"
+
+    def close(self):
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+
+def watch(client, spectate=False, scale=Interpreter.SCALE):  # Show a client's frames in a window, sending its keys
+    pygame = init_pygame("display")
+    from Audio import Beeper, PygameSink
+    from Renderer import Renderer, open_window
+
+    screen = open_window((Interpreter.CHIP8_WIDTH * scale, Interpreter.CHIP8_HEIGHT * scale),
+                         caption="ChiPy-8 Netplay")
+    renderer = Renderer(Interpreter.CHIP8_WIDTH, Interpreter.CHIP8_HEIGHT, Interpreter.BACKGROUND_COLOR,
+                        Interpreter.FOREGROUND_COLOR)
+    codes = {pygame.key.key_code(name): key for name, key in Interpreter.KEY_MAP.items()}
+    beeper = Beeper(PygameSink())
+    try:
+        while not pygame.event.get(eventtype=pygame.QUIT):
+            pygame.event.clear()
+            if not spectate:
+                poll = pygame.key.get_pressed()
+                keys = [0] * 16
+                for code, key in codes.items():
+                    if poll[code]:
+                        keys[key] = 1
+                if keys != client.keys:
+                    client.send_keys(keys)
+            client.receive()
+            beeper.frame(client.sound_timer > 0)
+            rect = renderer.draw(client.display, screen, screen.get_rect())
+            if rect is not None:
+                pygame.display.update(rect)
+    finally:
+        beeper.close()
+
+
+def main(argv=None):
+    from main import parse_rom
+    from Quirks import PROFILES
+
+    parser = argparse.ArgumentParser(description="Serve a ROM to netplay clients, or connect to a server")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve = commands.add_parser("serve", help="Run a ROM headless and stream it to every client")
+    serve.add_argument("rom", help="ROM file name in Roms/ or a path to a ROM, optionally as ROM@profile")
+    serve.add_argument("--host", default="0.0.0.0", help="Address to listen on (default: %(default)s)")
+    serve.add_argument("--port", type=int, default=PORT, help="Port to listen on (default: %(default)s)")
+    serve.add_argument("--quirks", choices=sorted(PROFILES), help="Quirk profile. Defaults to the ROM's own profile")
+    connect = commands.add_parser("connect", help="Play or watch a served ROM in a window")
+    connect.add_argument("address", metavar="HOST[:PORT]")
+    connect.add_argument("--spectate", action="store_true", help="Only watch, never send keys")
+    connect.add_argument("--scale", type=int, default=Interpreter.SCALE, help="Window pixels per CHIP-8 pixel")
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        path, quirks = parse_rom(args.rom, args.quirks)
+        with NetplayServer(Interpreter(path, False, quirks, headless=True), args.host, args.port) as server:
+            print(F"Serving {path} on {server.address[0]}:{server.address[1]}")
+            try:
+                server.serve()
+            except KeyboardInterrupt:
+                pass
+        return
+
+    host, _, port = args.address.partition(":")
+    try:
+        client = NetplayClient(host, int(port) if port else PORT)
+    except OSError as e:
+        sys.exit(F"Could not connect to {args.address}: {e}")
+    error = None
+    with client:
+        try:
+            watch(client, args.spectate, args.scale)
+        except TimeoutError:
+            error = F"{args.address} stopped sending frames"
+        except ConnectionError as e:
+            error = str(e)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            print(client.stats(), file=sys.stderr)
+    if error:
+        sys.exit(error)
+
+
+if __name__ == '__main__':
+    main()
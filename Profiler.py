@@ -0,0 +1,67 @@
+from collections import Counter, defaultdict
+from time import perf_counter
+
+
+class CallProfiler:
+    """
+    Call graph profile of a ROM's subroutines: how often each is called and by whom, and the emulated cycles and host
+    time spent inside it, both including its own callees (total) and excluding them (self). Only CALL and RET are
+    wrapped, so the cost of profiling grows with the number of calls rather than instructions. The return stack lives
+    outside CHIP-8 memory, so every RET goes back to its CALL + 2 and return addresses are not checked.
+    """
+
+    def __init__(self):
+        self.calls = Counter()  # subroutine address -> calls
+        self.callers = Counter()  # (calling subroutine, or None for the top level, subroutine) -> calls
+        self.total_cycles = Counter()
+        self.self_cycles = Counter()
+        self.total_seconds = defaultdict(float)
+        self.self_seconds = defaultdict(float)
+        self._active = []  # [subroutine, cycles at entry, time at entry, cycles in callees, time in callees]
+
+    def attach(self, interpreter):  # Start profiling an Interpreter; called by Interpreter(profiler=...)
+        def wrap(handler):
+            if handler.__name__ == "OP_2nnn":
+                def call():
+                    handler()
+                    self.enter(interpreter.program_counter, interpreter.cycles)
+                return call
+            if handler.__name__ == "OP_00EE":
+                def ret():
+                    handler()
+                    self.leave(interpreter.cycles)
+                return ret
+            return handler
+
+        interpreter.wrap_handlers(wrap)
+
+    def enter(self, subroutine, cycles):
+        caller = self._active[-1][0] if self._active else None
+        self.calls[subroutine] += 1
+        self.callers[(caller, subroutine)] += 1
+        self._active.append([subroutine, cycles, perf_counter(), 0, 0.0])
+
+    def leave(self, cycles):
+        if not self._active:
+            return
+        subroutine, start_cycles, start_time, callee_cycles, callee_seconds = self._active.pop()
+        cycles -= start_cycles
+        seconds = perf_counter() - start_time
+        self.total_cycles[subroutine] += cycles
+        self.self_cycles[subroutine] += cycles - callee_cycles
+        self.total_seconds[subroutine] += seconds
+        self.self_seconds[subroutine] += seconds - callee_seconds
+        if self._active:
+            self._active[-1][3] += cycles
+            self._active[-1][4] += seconds
+
+    def report(self, top=20):
+        lines = [F"{'subroutine':>10}{'calls':>10}{'total cycles':>14}{'self cycles':>13}{'total ms':>10}{'self ms':>9}"
+                 F"  callers"]
+        for subroutine in sorted(self.calls, key=lambda s: -self.total_cycles[s])[:top]:
+            callers = ", ".join(F"{'top' if caller is None else hex(caller)} ({calls})"
+                                for (caller, callee), calls in self.callers.most_common() if callee == subroutine)
+            lines.append(F"{hex(subroutine):>10}{self.calls[subroutine]:10}{self.total_cycles[subroutine]:14}"
+                         F"{self.self_cycles[subroutine]:13}{self.total_seconds[subroutine] * 1000:10.1f}"
+                         F"{self.self_seconds[subroutine] * 1000:9.1f}  {callers}")
+        return "\n".join(lines)
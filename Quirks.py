@@ -0,0 +1,55 @@
+import os
+from collections import namedtuple
+
+# Behaviours that differ between CHIP-8 implementations. Each field picks which variant of an opcode the Interpreter
+# binds into its dispatch maps when it is constructed, so a quirk never costs a branch per instruction.
+#
+# shift_uses_vy:           8xy6/8xyE shift Vy into Vx instead of shifting Vx in place
+# load_store_increments_i: Fx55/Fx65 leave I pointing past the last register transferred
+# load_store_i_by_x:       with load_store_increments_i, I is advanced by x rather than x + 1, CHIP-48's off by one
+# jump_uses_vx:            Bnnn behaves as Bxnn and jumps to xnn + Vx instead of nnn + V0
+# logic_resets_vf:         8xy1/8xy2/8xy3 clear VF
+# clip_sprites:            Dxyn clips sprites at the screen edges instead of wrapping them around
+Quirks = namedtuple("Quirks", [
+    "shift_uses_vy",
+    "load_store_increments_i",
+    "load_store_i_by_x",
+    "jump_uses_vx",
+    "logic_resets_vf",
+    "clip_sprites",
+])
+
+COSMAC_VIP = Quirks(shift_uses_vy=True, load_store_increments_i=True, load_store_i_by_x=False, jump_uses_vx=False,
+                    logic_resets_vf=True, clip_sprites=True)
+CHIP48 = Quirks(shift_uses_vy=False, load_store_increments_i=True, load_store_i_by_x=True, jump_uses_vx=True,
+                logic_resets_vf=False, clip_sprites=True)
+SCHIP = Quirks(shift_uses_vy=False, load_store_increments_i=False, load_store_i_by_x=False, jump_uses_vx=True,
+               logic_resets_vf=False, clip_sprites=True)
+# Cowgod's technical reference, the behaviour ChiPy-8 has always had
+MODERN = Quirks(shift_uses_vy=False, load_store_increments_i=False, load_store_i_by_x=False, jump_uses_vx=False,
+                logic_resets_vf=False, clip_sprites=False)
+
+PROFILES = {
+    "vip": COSMAC_VIP,
+    "chip48": CHIP48,
+    "schip": SCHIP,
+    "modern": MODERN,
+}
+
+DEFAULT_PROFILE = "modern"
+
+# Bundled ROMs that only play correctly under a profile other than the default
+ROM_PROFILES = {
+    "BLITZ": "vip",
+}
+
+
+def get_profile(name):
+    try:
+        return PROFILES[name.lower()]
+    except KeyError:
+        raise ValueError(F"Unknown quirk profile '{name}'. Expected one of: {', '.join(PROFILES)}") from None
+
+
+def profile_for_rom(rom_path):
+    return get_profile(ROM_PROFILES.get(os.path.basename(rom_path), DEFAULT_PROFILE))
@@ -0,0 +1,116 @@
+import pygame
+
+
+def open_window(size, resizable=False, fullscreen=False, caption="ChiPy-8 Interpreter"):
+    flags = (pygame.RESIZABLE if resizable else 0) | (pygame.FULLSCREEN if fullscreen else 0)
+    screen = pygame.display.set_mode((0, 0) if fullscreen else size, flags)
+    pygame.display.set_caption(caption)
+    return screen
+
+
+class Renderer:
+    """
+    Draws a CHIP-8 framebuffer into a native resolution 8 bit surface, one byte per pixel, and upscales it onto the
+    window with a single pygame.transform.scale, so the cost of a frame barely depends on the window size. The image is
+    scaled by the largest whole number that fits the target area and centred in it.
+
+    With fade_frames > 0, pixels that switch off fade out over that many frames, like a phosphor screen. Only pixels
+    that changed since the last frame or are still fading are touched.
+    """
+
+    def __init__(self, width, height, background, foreground, fade_frames=0):
+        self.width = width
+        self.height = height
+        self.fade_frames = fade_frames
+        self._lit = fade_frames + 1  # Palette index of a pixel that is on; 0 is off, anything between is fading
+
+        self._native = pygame.Surface((width, height), depth=8)
+        self._native.set_palette([self._blend(background, foreground, level / self._lit) for level in
+                                  range(self._lit + 1)])
+        self._rgb = None  # The native image in the target's pixel format, ready to be scaled
+        self._scaled = None  # (target surface, target area, subsurface the scaled image is written into)
+        self._last_frame = None
+        self._levels = bytearray(width * height)
+        self._fading = set()
+        self._dirty = True
+
+    @staticmethod
+    def _blend(background, foreground, amount):
+        return tuple(round(b + (f - b) * amount) for b, f in zip(background, foreground))
+
+    def invalidate(self):  # Force the next draw() to repaint, e.g. after the window was resized or painted over
+        self._dirty = True
+        self._scaled = None
+
+    def update(self, display, decay=True):
+        """
+        Bring the native image up to date with a framebuffer. Returns False if nothing on screen changed. Fading pixels
+        dim by one step per call, so calls are expected once per 60 Hz frame; decay=False shows the framebuffer mid
+        frame, e.g. after a single step in the debugger, without advancing the fade.
+        """
+        frame = bytes(display)
+        changed = frame != self._last_frame
+        if not changed and (not self._fading or not decay):
+            return self._dirty
+
+        pixels = frame
+        if self.fade_frames:
+            self._update_fade(frame, decay)
+            pixels = bytes(self._levels)
+
+        buffer = self._native.get_buffer()
+        buffer.write(pixels, 0)
+        del buffer  # Releases the lock on the surface
+        self._last_frame = frame
+        self._dirty = True
+        return True
+
+    def _update_fade(self, frame, decay=True):
+        levels = self._levels
+        for idx in self._fading.copy() if decay else ():
+            levels[idx] -= 1
+            if not levels[idx]:
+                self._fading.discard(idx)
+
+        if frame == self._last_frame:
+            return
+
+        # Every pixel is one byte that is 0 or 1, so XORing the frames as integers marks exactly the changed bytes
+        last = self._last_frame or bytes(len(frame))
+        size = len(frame)
+        diff = int.from_bytes(frame, "big") ^ int.from_bytes(last, "big")
+        while diff:
+            byte = ((diff & -diff).bit_length() - 1) >> 3
+            diff &= ~(0xFF << (byte << 3))
+            idx = size - 1 - byte
+            if frame[idx]:
+                levels[idx] = self._lit
+                self._fading.discard(idx)
+            else:
+                self._fading.add(idx)
+
+    def draw(self, display, surface, area, decay=True):
+        """
+        Draw a framebuffer onto the rect `area` of `surface`. Returns the rect that needs presenting, or None if the
+        screen is unchanged.
+        """
+        if not self.update(display, decay):
+            return None
+
+        if self._scaled is None or self._scaled[0] is not surface or self._scaled[1] != area:
+            area = pygame.Rect(area)
+            scale = min(area.width // self.width, area.height // self.height)
+            target = pygame.Rect((0, 0), (self.width * scale, self.height * scale))
+            target.center = area.center
+            surface.fill(self._native.get_palette_at(0), area)
+            self._rgb = pygame.Surface((self.width, self.height), 0, surface)
+            # An area too small for one window pixel per CHIP-8 pixel, e.g. a shrunk window, only shows the background
+            self._scaled = (surface, area, surface.subsurface(target) if scale else None)
+
+        subsurface = self._scaled[2]
+        if subsurface is not None:
+            self._rgb.blit(self._native, (0, 0))
+            pygame.transform.scale(self._rgb, subsurface.get_size(), subsurface)
+        self._dirty = False
+        return self._scaled[1]
+
@@ -0,0 +1,44 @@
+from bisect import bisect_right
+
+
+class ScriptedInput:
+    """
+    Key presses for headless runs. Each event holds a CHIP-8 key (0x0 - 0xF) down from its start frame up to, but not
+    including, its end frame. The key state is worked out up front for every frame where it changes, so applying the
+    script while running is a dict lookup per frame.
+    """
+
+    def __init__(self, events=()):
+        self.events = [tuple(event) for event in events]
+        self._changes = sorted({start for start, _, _ in self.events} | {end for _, end, _ in self.events})
+        self._keys = {frame: [int(any(start <= frame < end and key == k for start, end, key in self.events))
+                              for k in range(16)]
+                      for frame in self._changes}
+
+    @classmethod
+    def from_file(cls, path):
+        """
+        One event per line as "start end key", with frames in decimal and the key in hex, e.g. "30 40 5" holds key 5
+        for frames 30 to 39. Blank lines and anything after a # are ignored.
+        """
+        events = []
+        with open(path) as f:
+            for number, line in enumerate(f, 1):
+                line = line.split("#", 1)[0].strip()
+                if not line:
+                    continue
+                try:
+                    start, end, key = line.split()
+                    events.append((int(start), int(end), int(key, 16)))
+                except ValueError:
+                    raise ValueError(F"{path}:{number}: expected 'start end key', got {line!r}") from None
+        return cls(events)
+
+    def keys_at(self, frame):
+        idx = bisect_right(self._changes, frame)
+        return self._keys[self._changes[idx - 1]][:] if idx else [0] * 16
+
+    def apply(self, interpreter, frame):  # Call at least once per frame, in order, starting at frame 0
+        keys = self._keys.get(frame)
+        if keys is not None:
+            interpreter.input = keys[:]
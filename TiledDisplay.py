@@ -0,0 +1,120 @@
+from math import ceil, sqrt
+from Interpreter import Interpreter, init_pygame
+
+
+class TiledDisplay:
+    """
+    Runs several headless Interpreters side by side in one window. A shared scheduler steps every interpreter through
+    one 60 Hz frame in turn, draws each into its own tile through its own Renderer, and presents the window once per
+    frame. The keyboard drives the focused tile, which is picked by clicking on it; tiles with a ScriptedInput follow
+    their script instead. A tile whose ROM crashes stops and keeps showing its last frame.
+    """
+    BORDER = 2
+    BORDER_COLOR = (0, 0, 0)
+    FOCUS_COLOR = (255, 255, 60)
+    FRAME_RATE = 60
+    SCALE = 10
+
+    def __init__(self, interpreters, scale=SCALE, resizable=False, fullscreen=False, fade_frames=0, turbo=False):
+        pygame = init_pygame("display")
+        from Renderer import Renderer, open_window
+
+        self.interpreters = interpreters
+        self.columns = ceil(sqrt(len(interpreters)))
+        self.rows = ceil(len(interpreters) / self.columns)
+        tile_width = Interpreter.CHIP8_WIDTH * scale + 2 * TiledDisplay.BORDER
+        tile_height = Interpreter.CHIP8_HEIGHT * scale + 2 * TiledDisplay.BORDER
+        self.screen = open_window((tile_width * self.columns, tile_height * self.rows), resizable, fullscreen,
+                                  "ChiPy-8 Interpreter")
+        self.renderers = [Renderer(Interpreter.CHIP8_WIDTH, Interpreter.CHIP8_HEIGHT, Interpreter.BACKGROUND_COLOR,
+                                   Interpreter.FOREGROUND_COLOR, fade_frames) for _ in interpreters]
+        self.keys = {pygame.key.key_code(name): key for name, key in interpreters[0].input_map.items()}
+        self.clock = pygame.time.Clock()
+        self.frame_rate = 0 if turbo else TiledDisplay.FRAME_RATE
+        self.frames = 0
+        self.focus = 0
+        self.crashed = {}  # index -> the exception that stopped that tile
+        self.tiles = []
+        self.layout()
+
+    def layout(self):  # Split the window into one rect per tile, and repaint everything on the next frame
+        pygame = init_pygame()
+        width = self.screen.get_width() // self.columns
+        height = self.screen.get_height() // self.rows
+        self.tiles = [pygame.Rect(idx % self.columns * width, idx // self.columns * height, width, height)
+                      for idx in range(len(self.interpreters))]
+        self.screen.fill(TiledDisplay.BORDER_COLOR)
+        for renderer in self.renderers:
+            renderer.invalidate()
+        self._borders_dirty = True
+
+    def handle_events(self):  # Returns False once the window has been closed
+        pygame = init_pygame()
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                return False
+            if event.type in (pygame.VIDEORESIZE, pygame.WINDOWEXPOSED):
+                self.screen = pygame.display.get_surface()
+                self.layout()
+            elif event.type == pygame.MOUSEBUTTONDOWN:
+                for idx, tile in enumerate(self.tiles):
+                    if tile.collidepoint(event.pos):
+                        self.focus = idx
+                        self._borders_dirty = True
+        return True
+
+    def read_keys(self):
+        poll = init_pygame().key.get_pressed()
+        keys = [0] * 16
+        for code, key in self.keys.items():
+            if poll[code]:
+                keys[key] = 1
+        return keys
+
+    def frame(self):
+        keys = self.read_keys()
+        for idx, interpreter in enumerate(self.interpreters):
+            if idx in self.crashed:
+                continue
+            if interpreter.script is not None:
+                interpreter.script.apply(interpreter, interpreter.frames)
+            elif idx == self.focus:
+                interpreter.input = keys[:]
+            else:
+                interpreter.input = [0] * 16
+
+            try:
+                frame = interpreter.frames
+                while interpreter.frames == frame:  # A frame is a varying number of instructions under a timing model
+                    interpreter.step()
+            except Exception as e:
+                self.crashed[idx] = e
+
+        self.present()
+        self.clock.tick(self.frame_rate)
+        self.frames += 1
+
+    def present(self):
+        pygame = init_pygame()
+        border = TiledDisplay.BORDER
+        changed = []
+        for renderer, interpreter, tile in zip(self.renderers, self.interpreters, self.tiles):
+            rect = renderer.draw(interpreter.display, self.screen, tile.inflate(-2 * border, -2 * border))
+            if rect is not None:
+                changed.append(rect)
+
+        if self._borders_dirty:
+            for idx, tile in enumerate(self.tiles):
+                color = TiledDisplay.FOCUS_COLOR if idx == self.focus else TiledDisplay.BORDER_COLOR
+                pygame.draw.rect(self.screen, color, tile, border)
+                changed.append(tile)
+            self._borders_dirty = False
+
+        if changed:
+            pygame.display.update(changed)  # A single present for every tile that changed
+
+    def run(self, frames=None):
+        while frames is None or self.frames < frames:
+            if not self.handle_events():
+                break
+            self.frame()
@@ -0,0 +1,52 @@
+from collections import namedtuple
+
+# Optional timing model. Without one every instruction costs a single cycle and a 60 Hz frame is
+# Interpreter.TICKS_PER_FRAME of them. With one, each instruction is charged its own cost as it executes, and the timers
+# and display interrupt fire whenever a frame's worth of cycles has been spent, so instructions keep their relative
+# speeds. Like quirks, costs are resolved when the Interpreter builds its dispatch maps.
+#
+# cycle_rate:            cycles per second of emulated time
+# cycles_per_frame:      cycles from one 60 Hz display interrupt to the next
+# interrupt_cycles:      cycles of every frame taken by the display interrupt, during which no instructions run
+# costs:                 cycles per instruction, keyed by the opcode pattern in the handler's name, e.g. "8xy4"
+# per_row:               extra cycles for every sprite row drawn by Dxyn
+# per_register:          extra cycles for every register stored or loaded by Fx55/Fx65
+# draw_waits_for_vblank: Dxyn waits for the next display interrupt, so the rest of the frame is spent waiting
+Timing = namedtuple("Timing", [
+    "cycle_rate",
+    "cycles_per_frame",
+    "interrupt_cycles",
+    "costs",
+    "per_row",
+    "per_register",
+    "draw_waits_for_vblank",
+])
+
+# The COSMAC VIP's 1802 runs at 1.7609 MHz with 8 clocks per machine cycle, and the 1861 video chip takes one machine
+# cycle of DMA for each of the 8 bytes on its 128 scan lines. Costs are approximate machine cycles including the
+# interpreter's fetch and decode, from measurements of the original CHIP-8 interpreter.
+COSMAC_VIP_TIMING = Timing(
+    cycle_rate=1760900 // 8,
+    cycles_per_frame=1760900 // 8 // 60,
+    interrupt_cycles=8 * 128,
+    costs={
+        "00E0": 24, "00EE": 23, "1nnn": 23, "2nnn": 23, "3xkk": 12, "4xkk": 12, "5xy0": 16, "6xkk": 6, "7xkk": 10,
+        "8xy0": 44, "8xy1": 44, "8xy2": 44, "8xy3": 44, "8xy4": 44, "8xy5": 44, "8xy6": 44, "8xy7": 44, "8xyE": 44,
+        "9xy0": 16, "Annn": 12, "Bnnn": 23, "Bxnn": 23, "Cxkk": 36, "Dxyn": 68, "Ex9E": 16, "ExA1": 16, "Fx07": 10,
+        "Fx0A": 10, "Fx15": 10, "Fx18": 10, "Fx1E": 19, "Fx29": 20, "Fx33": 204, "Fx55": 10, "Fx65": 10,
+    },
+    per_row=34,
+    per_register=14,
+    draw_waits_for_vblank=True,
+)
+
+TIMINGS = {
+    "vip": COSMAC_VIP_TIMING,
+}
+
+
+def get_timing(name):
+    try:
+        return TIMINGS[name.lower()]
+    except KeyError:
+        raise ValueError(F"Unknown timing model '{name}'. Expected one of: {', '.join(TIMINGS)}") from None
@@ -0,0 +1,158 @@
+"""
+Instruction and memory access traces.
+
+A trace is a short header followed by fixed width little endian records of a kind byte and two 16 bit fields:
+
+INSTRUCTION  address = program counter, value = opcode
+READ         address = first byte read, value = number of bytes (Fx65 registers, Dxyn sprite rows)
+WRITE        address = first byte written, value = number of bytes (Fx33 digits, Fx55 registers)
+
+An access is recorded straight after the instruction that makes it.
+
+python3 Tracer.py trace.bin   summarise a trace
+"""
+import argparse
+import os
+import struct
+from collections import Counter, namedtuple
+
+MAGIC = b"C8TR\x01"
+RECORD = struct.Struct("<BHH")
+INSTRUCTION, READ, WRITE = range(3)
+KIND_NAMES = ("instruction", "read", "write")
+
+Record = namedtuple("Record", ["kind", "address", "value"])
+
+
+def _register_count(op_code):
+    return ((op_code & 0x0F00) >> 8) + 1
+
+
+# Opcodes that touch the memory at I, as (kind, number of bytes for an opcode)
+ACCESSES = {
+    "Dxyn": (READ, lambda op_code: op_code & 0x000F),
+    "Fx33": (WRITE, lambda op_code: 3),
+    "Fx55": (WRITE, _register_count),
+    "Fx65": (READ, _register_count),
+}
+
+
+class Tracer:
+    """
+    Appends the trace of one or more Interpreters to a file. Records are packed into an in-memory buffer that is written
+    out whenever it grows past buffer_size bytes, so tracing costs a struct pack per record rather than a write.
+    """
+
+    def __init__(self, path, buffer_size=1 << 16):
+        self.path = path
+        self.buffer_size = buffer_size
+        self.records = 0
+        self._buffer = bytearray()
+        new = not os.path.exists(path) or not os.path.getsize(path)
+        if not new:
+            with open(path, "rb") as f:
+                if f.read(len(MAGIC)) != MAGIC:
+                    raise ValueError(F"{path} is not a trace")
+        self._file = open(path, "ab")
+        if new:
+            self._file.write(MAGIC)
+
+    def attach(self, interpreter):  # Start tracing an Interpreter; called by Interpreter(tracer=...)
+        def wrap(handler):
+            access = ACCESSES.get(handler.__name__[3:7])
+            if access is None:
+                def traced():
+                    self.record(INSTRUCTION, interpreter.program_counter - 2, interpreter.op_code)
+                    handler()
+            else:
+                kind, length = access
+
+                def traced():
+                    op_code = interpreter.op_code
+                    self.record(INSTRUCTION, interpreter.program_counter - 2, op_code)
+                    self.record(kind, interpreter.index_register & 0xFFFF, length(op_code))
+                    handler()
+            return traced
+
+        def wrap_dispatch(dispatch):
+            def traced():
+                records = self.records
+                try:
+                    dispatch()
+                except Exception:
+                    if self.records == records:  # No handler for the opcode, so the fault is its only record
+                        self.record(INSTRUCTION, interpreter.program_counter - 2, interpreter.op_code)
+                    raise
+            return traced
+
+        interpreter.wrap_handlers(wrap)
+        for key, handler in interpreter.op_map.items():  # The dispatchers of 0x0, 0x8, 0xE and 0xF opcodes
+            if not handler.__name__.startswith("OP_"):
+                interpreter.op_map[key] = wrap_dispatch(handler)
+
+    def record(self, kind, address, value):
+        self._buffer += RECORD.pack(kind, address, value)
+        self.records += 1
+        if len(self._buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        self._file.write(self._buffer)
+        self._buffer.clear()
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+
+def read_trace(path, chunk_records=1 << 14):
+    """Stream the records of a trace, reading chunk_records at a time so the whole trace is never held in memory"""
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(F"{path} is not a trace")
+        while True:
+            chunk = f.read(RECORD.size * chunk_records)
+            if len(chunk) % RECORD.size:
+                raise ValueError(F"{path} ends with a partial record")
+            if not chunk:
+                return
+            for record in RECORD.iter_unpack(chunk):
+                yield Record(*record)
+
+
+def summarise(path, top=10):
+    kinds = Counter()
+    opcodes = Counter()
+    written = Counter()
+    for kind, address, value in read_trace(path):
+        kinds[kind] += 1
+        if kind == INSTRUCTION:
+            opcodes[value >> 12] += 1
+        elif kind == WRITE:
+            written.update(range(address, address + value))
+
+    lines = [F"{kinds[kind]:10} {KIND_NAMES[kind]}s" for kind in (INSTRUCTION, READ, WRITE)]
+    lines.append("Instructions by leading nibble: " + ", ".join(F"{nibble:X}: {count}" for nibble, count in
+                                                              sorted(opcodes.items())))
+    lines.append("Most written addresses: " + ", ".join(F"{address:03X} ({count})" for address, count in
+                                                      written.most_common(top)))
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarise a ChiPy-8 trace")
+    parser.add_argument("trace")
+    args = parser.parse_args()
+    print(summarise(args.trace))
+
+
+if __name__ == '__main__':
+    main()
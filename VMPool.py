@@ -0,0 +1,52 @@
+import os
+from contextlib import contextmanager
+from Interpreter import Interpreter
+
+
+class VMPool:
+    """
+    Hands out Interpreters that are reset instead of rebuilt. Constructing an Interpreter sets up pygame, the dispatch
+    maps and the key maps; a pooled one only needs reset(), which restores memory from a cached image. ROM files are
+    cached by path and only read again when their modification time or size changes. Every Interpreter in a pool
+    shares the keyword arguments the pool was created with.
+    """
+
+    def __init__(self, size=None, **interpreter_args):
+        self.size = size  # Most idle Interpreters kept around, or None for no limit
+        self.interpreter_args = interpreter_args
+        self._idle = []
+        self._roms = {}  # path -> ((mtime, size), ROM bytes)
+
+    def read_rom(self, rom_path):
+        stat = os.stat(rom_path)
+        version = (stat.st_mtime_ns, stat.st_size)
+        cached = self._roms.get(rom_path)
+        if cached is None or cached[0] != version:
+            with open(rom_path, "rb") as f:
+                cached = self._roms[rom_path] = (version, f.read())
+        return cached[1]
+
+    def acquire(self, rom_path=None, rom=None):
+        if rom is None:
+            rom = self.read_rom(rom_path)
+        if not self._idle:
+            return Interpreter(None, False, rom=rom, **self.interpreter_args)
+
+        interpreter = self._idle.pop()
+        if interpreter.rom == rom:
+            interpreter.reset()  # Same ROM, so the cached memory image is still good
+        else:
+            interpreter.reset(rom)
+        return interpreter
+
+    def release(self, interpreter):
+        if self.size is None or len(self._idle) < self.size:
+            self._idle.append(interpreter)
+
+    @contextmanager
+    def vm(self, rom_path=None, rom=None):
+        interpreter = self.acquire(rom_path, rom)
+        try:
+            yield interpreter
+        finally:
+            self.release(interpreter)
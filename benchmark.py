@@ -0,0 +1,190 @@
+"""
+Benchmarks for ChiPy-8.
+
+python3 benchmark.py startup   time short-lived interpreter processes, from launch to exit
+python3 benchmark.py render    time drawing a frame at several window sizes
+python3 benchmark.py timing    compare emulated time against host time, with and without a timing model
+python3 benchmark.py workloads time the synthetic DRW, branch and memory copy heavy ROMs in workloads/
+python3 benchmark.py core      time the workloads on the compiled core against the pure Python one, see build_core.py
+python3 benchmark.py netplay   stream PONG over loopback and measure bytes per frame and key to frame latency
+"""
+import argparse
+import os
+import subprocess
+import sys
+from statistics import median
+from time import perf_counter
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+ROM = os.path.join(ROOT, "Roms", "PONG")
+WORKLOADS = os.path.join(ROOT, "workloads")
+
+# Each snippet runs in a fresh process, so the timings include interpreter start up and every import
+STARTUP_SNIPPETS = {
+    "python": "pass",
+    "pygame.init()": "import pygame; pygame.init()",
+    "import Interpreter": "import Interpreter",
+    "headless, 600 instructions": F"""
+from Interpreter import Interpreter
+interpreter = Interpreter({ROM!r}, False, headless=True)
+for _ in range(600):
+    interpreter.step()
+""",
+    "window": F"""
+from Interpreter import Interpreter
+Interpreter({ROM!r}, False)
+""",
+}
+
+
+def time_process(snippet, runs):
+    env = dict(os.environ, PYGAME_HIDE_SUPPORT_PROMPT="1")
+    times = []
+    for _ in range(runs):
+        start = perf_counter()
+        subprocess.run([sys.executable, "-c", snippet], cwd=ROOT, env=env, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        times.append(perf_counter() - start)
+    return median(times)
+
+
+def startup(runs):
+    for name, snippet in STARTUP_SNIPPETS.items():
+        print(F"{name:<30}{time_process(snippet, runs) * 1000:8.1f} ms")
+
+
+def render(runs):
+    from Interpreter import Interpreter, init_pygame
+    pygame = init_pygame("display")
+    from Renderer import Renderer
+
+    frames = [[(x + y + i) % 2 for y in range(Interpreter.CHIP8_HEIGHT) for x in range(Interpreter.CHIP8_WIDTH)]
+              for i in range(2)]  # Alternate between two frames so every draw has work to do
+    colors = (Interpreter.BACKGROUND_COLOR, Interpreter.FOREGROUND_COLOR)
+
+    def draw_rects(surface, display):  # How frames were drawn before the Renderer: one rect per CHIP-8 pixel
+        width = surface.get_width() // Interpreter.CHIP8_WIDTH
+        height = surface.get_height() // Interpreter.CHIP8_HEIGHT
+        for idx, pixel in enumerate(display):
+            x = idx % Interpreter.CHIP8_WIDTH
+            y = idx // Interpreter.CHIP8_WIDTH
+            pygame.draw.rect(surface, colors[pixel], (width * x, height * y, width, height))
+
+    for scale in (5, 10, 25, 40):
+        surface = pygame.Surface((Interpreter.CHIP8_WIDTH * scale, Interpreter.CHIP8_HEIGHT * scale))
+        renderer = Renderer(Interpreter.CHIP8_WIDTH, Interpreter.CHIP8_HEIGHT, *colors)
+        results = []
+        for draw in (lambda i: draw_rects(surface, frames[i % 2]),
+                     lambda i: renderer.draw(frames[i % 2], surface, surface.get_rect())):
+            start = perf_counter()
+            for i in range(runs):
+                draw(i)
+            results.append((perf_counter() - start) / runs * 1000)
+        size = F"{surface.get_width()}x{surface.get_height()}"
+        print(F"{size:<12}rects {results[0]:6.2f} ms   Renderer {results[1]:6.2f} ms")
+
+
+def timing(runs):
+    from Interpreter import Interpreter
+    from Timing import TIMINGS
+
+    frames = 600
+    for name in ("PONG", "BRIX", "INVADERS", "BLITZ"):
+        for model in (None,) + tuple(TIMINGS):
+            results = []
+            for _ in range(runs):
+                interpreter = Interpreter(os.path.join(ROOT, "Roms", name), False, headless=True,
+                                          timing=TIMINGS.get(model))
+                instructions = 0
+                start = perf_counter()
+                while interpreter.frames < frames:
+                    interpreter.step()
+                    instructions += 1
+                results.append(perf_counter() - start)
+            host = median(results)
+            print(F"{name:<10}{model or 'none':<6}{instructions:8} instructions{interpreter.cycles:10} cycles   "
+                  F"{interpreter.emulated_seconds:6.2f} s emulated in {host * 1000:7.1f} ms "
+                  F"({interpreter.emulated_seconds / host:6.1f}x)")
+
+
+def workloads(runs):
+    from Assembler import assemble
+    from Interpreter import Interpreter
+
+    instructions = 100000
+    for name in sorted(os.listdir(WORKLOADS)):
+        if not name.endswith(".asm"):
+            continue
+        with open(os.path.join(WORKLOADS, name)) as f:
+            rom = assemble(f.read())
+        interpreter = Interpreter(None, False, headless=True, rom=rom)
+        results = []
+        for _ in range(runs):
+            interpreter.reset()
+            start = perf_counter()
+            for _ in range(instructions):
+                interpreter.step()
+            results.append(perf_counter() - start)
+        print(F"{name:<14}{instructions / median(results):12,.0f} instructions/s")
+
+
+def core(runs):
+    import Interpreter
+    if Interpreter.core.__name__ != "CompiledCore":
+        sys.exit("The compiled core is missing or out of date, run build_core.py first")
+
+    rates = {}
+    for name, pure in (("compiled", ""), ("pure", "1")):  # Each in its own process, as the core is chosen on import
+        env = dict(os.environ, PYGAME_HIDE_SUPPORT_PROMPT="1", CHIPY8_PURE_PYTHON=pure)
+        output = subprocess.run([sys.executable, __file__, "workloads", "--runs", str(runs)], cwd=ROOT, env=env,
+                                check=True, stdout=subprocess.PIPE, universal_newlines=True).stdout
+        rates[name] = {line.split()[0]: float(line.split()[1].replace(",", "")) for line in output.splitlines()}
+
+    print(F"{'workload':<14}{'compiled':>12}{'pure':>12}   instructions/s")
+    for workload, rate in rates["compiled"].items():
+        print(F"{workload:<14}{rate:12,.0f}{rates['pure'][workload]:12,.0f}   {rate / rates['pure'][workload]:.2f}x")
+
+
+def netplay(runs):
+    import threading
+    from Interpreter import Interpreter
+    from Netplay import NetplayClient, NetplayServer
+
+    frames = 10 * runs
+    with NetplayServer(Interpreter(ROM, False, headless=True), port=0) as server:
+        thread = threading.Thread(target=server.serve, args=(frames,))  # Paced at 60 Hz, like a real server
+        with NetplayClient(*server.address) as client:
+            thread.start()
+            while client.receive() < frames:
+                if client.frame % 20 == 0:  # Alternate holding key 1 (left paddle up) and nothing
+                    client.send_keys([0, client.frame % 40 == 0] + [0] * 14)
+        thread.join()
+        latencies = sorted(client.latencies)
+        print(F"{client.frames_received} frames, {client.bytes_per_frame:.1f} bytes/frame "
+              F"({client.bytes_received * 60 / client.frames_received / 1024:.2f} KiB/s)")
+        print(F"key to frame latency: median {median(latencies) * 1000:.1f} ms, "
+              F"worst {latencies[-1] * 1000:.1f} ms over {len(latencies)} key changes")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ChiPy-8 benchmarks")
+    parser.add_argument("benchmark", choices=["startup", "render", "timing", "workloads", "core", "netplay"])
+    parser.add_argument("--runs", type=int, default=20, help="Runs per measurement; the median is reported")
+    args = parser.parse_args()
+
+    if args.benchmark == "startup":
+        startup(args.runs)
+    elif args.benchmark == "render":
+        render(args.runs)
+    elif args.benchmark == "timing":
+        timing(args.runs)
+    elif args.benchmark == "workloads":
+        workloads(args.runs)
+    elif args.benchmark == "core":
+        core(args.runs)
+    elif args.benchmark == "netplay":
+        netplay(args.runs)
+
+
+if __name__ == '__main__':
+    main()
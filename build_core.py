@@ -0,0 +1,70 @@
+"""
+Compile the CPU core in Core.py with Cython, from the same source, into the CompiledCore extension module. The
+Interpreter uses CompiledCore when it is importable and was built from the current Core.py, and the pure Python Core
+otherwise, or when the CHIPY8_PURE_PYTHON environment variable is set.
+
+pip3 install cython
+python3 build_core.py            build CompiledCore next to Core.py
+python3 build_core.py --clean    remove it again
+"""
+import argparse
+import glob
+import os
+import shutil
+import tempfile
+from hashlib import sha256
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+SOURCE = os.path.join(ROOT, "Core.py")
+MODULE = "CompiledCore"
+
+
+def built_modules():
+    return glob.glob(os.path.join(ROOT, MODULE + ".*.so")) + glob.glob(os.path.join(ROOT, MODULE + ".*.pyd"))
+
+
+def clean():
+    for path in built_modules():
+        os.remove(path)
+
+
+def build():
+    from Cython.Build import cythonize
+    from setuptools import Distribution, Extension
+
+    with open(SOURCE, "rb") as f:
+        source = f.read()
+
+    with tempfile.TemporaryDirectory() as build_dir:
+        # Cython names the module after its file, so compile a copy that also records which Core.py it came from
+        path = os.path.join(build_dir, MODULE + ".py")
+        with open(path, "wb") as f:
+            f.write(source)
+            f.write(F"\n\nSOURCE_DIGEST = {sha256(source).hexdigest()!r}\n".encode())
+        pxd = os.path.splitext(SOURCE)[0] + ".pxd"
+        if os.path.exists(pxd):
+            shutil.copy(pxd, os.path.join(build_dir, MODULE + ".pxd"))
+
+        extensions = cythonize([Extension(MODULE, [path])], build_dir=build_dir, quiet=True,
+                               compiler_directives={"language_level": 3})
+        clean()
+        distribution = Distribution({"name": MODULE, "ext_modules": extensions})
+        distribution.script_args = ["build_ext", "--build-lib", ROOT, "--build-temp", build_dir]
+        distribution.parse_command_line()
+        distribution.run_commands()
+    return built_modules()[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile the ChiPy-8 CPU core with Cython")
+    parser.add_argument("--clean", action="store_true", help="Remove the compiled core")
+    args = parser.parse_args()
+
+    if args.clean:
+        clean()
+        return
+    print(F"Built {os.path.relpath(build(), ROOT)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+"""
+Golden runs: every ROM in Roms/ is played headless for a fixed number of frames with a scripted set of key presses, and
+a CRC of the framebuffer after each frame, plus the final register state and call stack, is compared against the
+recorded goldens.
+
+python3 golden.py            check every ROM against the goldens
+python3 golden.py --record   re-record the goldens after an intentional change in behaviour
+"""
+import argparse
+import json
+import os
+import random
+import sys
+from zlib import crc32
+from Interpreter import Interpreter
+from Quirks import profile_for_rom
+from ScriptedInput import ScriptedInput
+
+ROM_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Roms")
+GOLDEN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "test_roms", "goldens.json")
+FRAMES = 300
+RANDOM_SEED = 0x8
+
+# Start the game, then move and fire with the keys most ROMs use (2/4/6/8, Q/W/E, 5)
+SCRIPT = [
+    (30, 40, 0x5),
+    (60, 70, 0x1),
+    (90, 130, 0x4),
+    (130, 170, 0x6),
+    (170, 180, 0x5),
+    (180, 200, 0x2),
+    (200, 220, 0x8),
+    (220, 230, 0xC),
+    (230, 260, 0xD),
+    (260, 270, 0x0),
+    (270, 290, 0xA),
+]
+
+
+def run_rom(rom_path, frames=FRAMES, script=SCRIPT):
+    """Play a ROM headless, returning the framebuffer CRC of every frame and the final machine state"""
+    random.seed(RANDOM_SEED)  # Cxkk draws from the module level generator
+    interpreter = Interpreter(rom_path, False, profile_for_rom(rom_path), headless=True)
+    script = ScriptedInput(script)
+    hashes = []
+    error = None
+
+    try:
+        for frame in range(frames):
+            script.apply(interpreter, frame)
+            for _ in range(Interpreter.TICKS_PER_FRAME):
+                interpreter.step()
+            hashes.append(crc32(bytes(interpreter.display)))
+    except Exception as e:
+        error = type(e).__name__
+
+    return {
+        "frames": " ".join(F"{h:08x}" for h in hashes),
+        "state": {
+            "registers": interpreter.registers,
+            "index_register": interpreter.index_register,
+            "program_counter": interpreter.program_counter,
+            "stack_pointer": interpreter.stack_pointer,
+            "stack": list(interpreter.stack),
+            "delay_timer": interpreter.delay_timer,
+            "sound_timer": interpreter.sound_timer,
+        },
+        "error": error,
+    }
+
+
+def rom_names():
+    return sorted(os.listdir(ROM_DIRECTORY))
+
+
+def record(path=GOLDEN_PATH):
+    goldens = {
+        "frames": FRAMES,
+        "script": SCRIPT,
+        "roms": {name: run_rom(os.path.join(ROM_DIRECTORY, name)) for name in rom_names()},
+    }
+    with open(path, "w") as f:
+        json.dump(goldens, f, indent=1, sort_keys=True)
+        f.write("\n")
+    return goldens
+
+
+def load(path=GOLDEN_PATH):
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(name, golden, frames=FRAMES, script=SCRIPT):
+    """Run one ROM and describe how it differs from its golden, or return None if it matches"""
+    result = run_rom(os.path.join(ROM_DIRECTORY, name), frames, script)
+    expected = golden["frames"].split()
+    actual = result["frames"].split()
+    for frame, (a, b) in enumerate(zip(expected, actual)):
+        if a != b:
+            return F"{name}: framebuffer differs from frame {frame}"
+    if len(expected) != len(actual):
+        return F"{name}: ran {len(actual)} frames ({result['error']}), expected {len(expected)} ({golden['error']})"
+    if result["state"] != golden["state"]:
+        return F"{name}: final state {result['state']} != {golden['state']}"
+    return None
+
+
+def check(path=GOLDEN_PATH):
+    goldens = load(path)
+    failures = []
+    for name in rom_names():
+        if name not in goldens["roms"]:
+            failures.append(F"{name}: no golden recorded")
+            continue
+        failure = compare(name, goldens["roms"][name], goldens["frames"], goldens["script"])
+        if failure:
+            failures.append(failure)
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check or re-record the golden runs of every ROM in Roms/")
+    parser.add_argument("--record", action="store_true", help="Overwrite the goldens with the current behaviour")
+    args = parser.parse_args()
+
+    if args.record:
+        goldens = record()
+        print(F"Recorded {len(goldens['roms'])} ROMs to {GOLDEN_PATH}")
+        return
+
+    failures = check()
+    for failure in failures:
+        print(failure)
+    print(F"{len(rom_names()) - len(failures)}/{len(rom_names())} ROMs match their goldens")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,19 +1,183 @@
-import sys
+import argparse
+import json
 import os
-from Debugger import Debugger
+import sys
+from time import perf_counter
+from Audio import Beeper, PygameSink, WavSink
 from Interpreter import Interpreter
+from Quirks import get_profile, profile_for_rom, PROFILES
+from Profiler import CallProfiler
+from ScriptedInput import ScriptedInput
+from Timing import get_timing, TIMINGS
+from Tracer import Tracer
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="ChiPy-8: a CHIP-8 interpreter")
+    parser.add_argument("roms", nargs="+", metavar="ROM",
+                        help="ROM file name in Roms/ or a path to a ROM, optionally as ROM@profile to pick its quirk "
+                             "profile. Several ROMs are run side by side, tiled in one window")
+    parser.add_argument("--debug", action="store_true", help="Open the debugger next to the display")
+    parser.add_argument("--headless", action="store_true", help="Run without a window, sound or throttling")
+    parser.add_argument("--quirks", choices=sorted(PROFILES), help="Quirk profile. Defaults to the ROM's own profile")
+    parser.add_argument("--timing", choices=sorted(TIMINGS),
+                        help="Charge each opcode its cycle cost on this machine, instead of one cycle per instruction")
+
+    speed = parser.add_mutually_exclusive_group()
+    speed.add_argument("--ips", type=int, default=Interpreter.INSTRUCTIONS_PER_SECOND,
+                       help="Instructions per second to throttle to (default: %(default)s)")
+    speed.add_argument("--turbo", action="store_true", help="Run as fast as possible")
+
+    parser.add_argument("--cycles", type=int, help="Stop after this many cycles (instructions, without --timing)")
+    parser.add_argument("--frames", type=int, help="Stop after this many 60 Hz frames")
+    parser.add_argument("--input", metavar="FILE", help="Scripted key presses, one 'start end key' per line")
+    parser.add_argument("--load-state", metavar="FILE", help="Resume from a state saved with --save-state")
+    parser.add_argument("--save-state", metavar="FILE", help="Save the machine state on exit")
+    parser.add_argument("--dump", metavar="FILE", help="Write the final registers and framebuffer as JSON ('-' for "
+                                                       "stdout)")
+    parser.add_argument("--scale", type=int, default=Interpreter.SCALE, help="Window pixels per CHIP-8 pixel")
+    parser.add_argument("--resizable", action="store_true", help="Let the window be resized")
+    parser.add_argument("--fullscreen", action="store_true", help="Fill the screen")
+    parser.add_argument("--fade", type=int, default=0, metavar="FRAMES",
+                        help="Fade pixels out over this many frames, like a phosphor screen")
+    parser.add_argument("--mute", action="store_true", help="Disable sound")
+    parser.add_argument("--wav", metavar="FILE", help="Record the sound to a WAV file instead of playing it")
+    parser.add_argument("--trace", metavar="FILE", help="Append every instruction and memory access to a binary trace")
+    parser.add_argument("--profile", action="store_true", help="Print a profile of the ROM's subroutine calls")
+    parser.add_argument("--stats", action="store_true", help="Print the emulated cycles and time against host time")
+
+    args = parser.parse_args(argv)
+    if len(args.roms) > 1 and args.roms[-1] == "debug":  # The original "main.py ROM debug" form
+        args.roms.pop()
+        args.debug = True
+    args.tiled = len(args.roms) > 1
+    if args.debug and args.headless:
+        parser.error("--debug needs a window and cannot be combined with --headless")
+    if args.tiled:
+        for option in ("debug", "headless", "load_state", "save_state", "dump", "wav", "cycles", "trace",
+                       "profile"):
+            if getattr(args, option):
+                parser.error(F"--{option.replace('_', '-')} only works with a single ROM")
+    return args
+
+
+def rom_path(name):
+    if os.path.exists(name):
+        return name
+    return os.path.join(os.getcwd(), "Roms", name)
+
+
+def parse_rom(spec, quirks=None):  # "PONG@vip" -> (path to PONG, the vip profile)
+    name, _, profile = spec.partition("@")
+    path = rom_path(name)
+    if profile:
+        return path, get_profile(profile)
+    return path, get_profile(quirks) if quirks else profile_for_rom(path)
+
+
+def create_interpreter(args):
+    path, quirks = parse_rom(args.roms[0], args.quirks)
+
+    audio = None
+    if args.wav:
+        audio = Beeper(WavSink(args.wav))
+    elif not args.mute and not args.headless:
+        audio = Beeper(PygameSink())
+
+    timing = get_timing(args.timing) if args.timing else None
+    tracer = Tracer(args.trace) if args.trace else None
+    interpreter = Interpreter(path, args.debug, quirks, audio, args.headless, scale=args.scale, fade_frames=args.fade,
+                              resizable=args.resizable, fullscreen=args.fullscreen, timing=timing, tracer=tracer,
+                              profiler=CallProfiler() if args.profile else None)
+    interpreter.instructions_per_second = 0 if args.turbo else args.ips
+    if args.input:
+        interpreter.script = ScriptedInput.from_file(args.input)
+    if args.load_state:
+        with open(args.load_state) as f:
+            interpreter.set_state(json.load(f))
+    return interpreter
+
+
+def create_tiled_display(args):
+    from TiledDisplay import TiledDisplay
+    interpreters = []
+    for spec in args.roms:
+        path, quirks = parse_rom(spec, args.quirks)
+        interpreter = Interpreter(path, False, quirks, headless=True,
+                                  timing=get_timing(args.timing) if args.timing else None)
+        if args.input:
+            interpreter.script = ScriptedInput.from_file(args.input)
+        interpreters.append(interpreter)
+    scale = args.scale if args.scale != Interpreter.SCALE else TiledDisplay.SCALE
+    return TiledDisplay(interpreters, scale, args.resizable, args.fullscreen, args.fade, args.turbo)
+
+
+def run(interpreter, cycles=None, frames=None):
+    while (cycles is None or interpreter.cycles < cycles) and (frames is None or interpreter.frames < frames):
+        interpreter.tick()
+
+
+def dump(interpreter):
+    state = interpreter.get_state()
+    rows = [state["display"][y * Interpreter.CHIP8_WIDTH: (y + 1) * Interpreter.CHIP8_WIDTH]
+            for y in range(Interpreter.CHIP8_HEIGHT)]
+    return {
+        "cycles": interpreter.cycles,
+        "frames": interpreter.frames,
+        "program_counter": interpreter.program_counter,
+        "registers": state["registers"],
+        "index_register": state["index_register"],
+        "stack": state["stack"],
+        "stack_pointer": interpreter.stack_pointer,
+        "delay_timer": state["delay_timer"],
+        "sound_timer": state["sound_timer"],
+        "display": ["".join(str(pixel) for pixel in row) for row in rows],
+    }
+
+
+def stats(interpreter, host_seconds):
+    emulated = interpreter.emulated_seconds
+    return (F"{interpreter.cycles} cycles, {interpreter.frames} frames: {emulated:.3f} s emulated in "
+            F"{host_seconds:.3f} s host time ({emulated / host_seconds if host_seconds else float('inf'):.1f}x)")
+
+
+def finish(interpreter, args):  # The state and dump are written first, so a failing close cannot lose them
+    if args.save_state:
+        with open(args.save_state, "w") as f:
+            json.dump(interpreter.get_state(), f)
+    if args.dump == "-":
+        json.dump(dump(interpreter), sys.stdout, indent=1)
+        print()
+    elif args.dump:
+        with open(args.dump, "w") as f:
+            json.dump(dump(interpreter), f, indent=1)
+    if interpreter.tracer is not None:
+        interpreter.tracer.close()
+    if interpreter.audio is not None:
+        interpreter.audio.close()
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.tiled:
+        create_tiled_display(args).run(args.frames)
+        return
 
+    interpreter = create_interpreter(args)
+    start = perf_counter()
+    try:
+        if args.debug:
+            from Debugger import Debugger  # Only pay for fonts and the debugger's imports when it is asked for
+            Debugger(interpreter).execute()
+        else:
+            run(interpreter, args.cycles, args.frames)
+    finally:
+        if args.stats:
+            print(stats(interpreter, perf_counter() - start), file=sys.stderr)
+        if args.profile:
+            print(interpreter.profiler.report(), file=sys.stderr)
+        finish(interpreter, args)
 
-def main():
-    print(sys.argv)
-    path = os.path.join(os.getcwd(), "Roms", sys.argv[1])
-    if "debug" in sys.argv:
-        interpreter = Interpreter(path, True)
-        Debugger(interpreter).execute()
-    else:
-        interpreter = Interpreter(path, False)
-        while True:
-            interpreter.tick()
 
 if __name__ == '__main__':
     main()
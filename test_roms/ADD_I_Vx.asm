@@ -0,0 +1 @@
+        ADD I, V1
@@ -0,0 +1 @@
+        AND V1, V2
@@ -0,0 +1 @@
+        ADD V1, 0xAA
@@ -0,0 +1 @@
+        DRW V0, V0, 5
@@ -0,0 +1 @@
+        LD B, VA
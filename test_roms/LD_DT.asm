@@ -0,0 +1 @@
+        LD DT, V1
@@ -0,0 +1 @@
+        LD F, V1
@@ -0,0 +1 @@
+        LD [I], VC
@@ -0,0 +1 @@
+        LD I, 0xABC
@@ -0,0 +1 @@
+        LD ST, V1
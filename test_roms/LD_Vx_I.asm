@@ -0,0 +1,2 @@
+        LD VC, [I]
+        DB 0x01, 0x23, 0x45, 0x67, 0x89, 0x10, 0x11, 0x12, 0x13, 0x14, 0x15, 0x16
@@ -0,0 +1 @@
+        LD V1, 0xAA
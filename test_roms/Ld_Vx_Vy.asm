@@ -0,0 +1 @@
+        LD V1, V2
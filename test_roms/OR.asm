@@ -0,0 +1 @@
+        OR V1, V2
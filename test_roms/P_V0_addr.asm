@@ -0,0 +1 @@
+        JP V0, 0xABC
@@ -0,0 +1 @@
+        RND V1, 0x0C
@@ -0,0 +1 @@
+        SE V0, 0x0A
@@ -0,0 +1 @@
+        SE VA, VA
@@ -0,0 +1 @@
+        SHL V1, V0
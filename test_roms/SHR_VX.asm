@@ -0,0 +1 @@
+        SHR V1, V0
@@ -0,0 +1,2 @@
+        SKNP V1
+        SKNP V1
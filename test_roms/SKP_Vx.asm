@@ -0,0 +1,2 @@
+        SKP V1
+        SKP V1
@@ -0,0 +1 @@
+        SNE V0, 0x0A
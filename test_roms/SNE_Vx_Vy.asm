@@ -0,0 +1 @@
+        SNE V0, V1
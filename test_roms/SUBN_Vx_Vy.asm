@@ -0,0 +1 @@
+        SUBN V1, V2
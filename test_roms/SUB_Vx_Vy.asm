@@ -0,0 +1 @@
+        SUB V1, V2
@@ -0,0 +1 @@
+        XOR V1, V2
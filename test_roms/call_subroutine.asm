@@ -0,0 +1,5 @@
+        CALL subroutine
+        SE V0, 0x11
+subroutine:
+        LD V0, 0x20
+        DB 0x70
@@ -0,0 +1 @@
+        CLS
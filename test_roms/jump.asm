@@ -0,0 +1 @@
+        JP 0x212
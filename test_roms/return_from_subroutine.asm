@@ -0,0 +1 @@
+        RET
@@ -1,21 +1,51 @@
+import json
+import random
 import os
+import socket
 import pygame
+import tempfile
 import unittest
+import wave
 from unittest.mock import patch
-from Interpreter import Interpreter
+from Assembler import assemble, AssemblyError
+from Audio import Beeper, NullSink, PygameSink, WavSink
+from Fuzzer import Fuzzer, INTERESTING_OPCODES, OPCODE_MASKS
+import golden
+import main
+from Interpreter import core, load_core, Interpreter, StackOverflow, StackUnderflow
+from Lockstep import Lockstep
+import Netplay
+from Netplay import NetplayClient, NetplayServer, rle_decode, rle_encode
+from Opcodes import op_code_map
+from Profiler import CallProfiler
+from VMPool import VMPool
+from Quirks import get_profile, profile_for_rom, Quirks, COSMAC_VIP, MODERN
+from ScriptedInput import ScriptedInput
+from Timing import get_timing, COSMAC_VIP_TIMING
+from Tracer import Tracer, read_trace, Record, INSTRUCTION, READ, WRITE
 from tests_utils import *
 
+POOL = VMPool()
 
 
 class Test(unittest.TestCase):
 
     def setUp(self):
-        patch('pygame.display.set_mode', lambda _: None).start()
+        patch('pygame.display.set_mode', lambda *_: None).start()
         patch('pygame.display.update', lambda _: None).start()
         patch('pygame.draw.rect', lambda a, b, c: None).start()
+        patch('Interpreter.Interpreter.draw', lambda *_: None).start()
         self.FAKE_KEYSTROKES = [0] * 97 + [1] + [0] * 300
         # Todo Patch Clock.tick()
 
+    def load(self, rom_name):
+        return self.load_path(os.path.join(os.getcwd(), "test_roms", rom_name))
+
+    def load_path(self, path):  # Reuse an Interpreter from the pool rather than constructing one per test
+        interpreter = POOL.acquire(path)
+        self.addCleanup(POOL.release, interpreter)
+        return interpreter
+
     def test_loads_rom_correctly(self):
         path = os.path.join(os.getcwd(), "test_roms", "rand_512_bytes.ch8")
         num_bytes = 512
@@ -25,110 +55,107 @@ class Test(unittest.TestCase):
             contents = file.read()
             hex_dump = [int('{:02X}'.format(b), 16) for b in contents]
 
-        interpreter = Interpreter(path, False)
+        interpreter = self.load_path(path)
         for idx, i in enumerate(
                 interpreter.memory[Interpreter.MEMORY_START_ADDRESS: Interpreter.MEMORY_START_ADDRESS + num_bytes]):
             self.assertEqual(hex_dump[idx], i, F"Wrong value at idx:{idx}. Got {i}, expected {hex_dump[idx]}")
 
     def test_OP_00E0(self):  # CLS: Clear the Display
-        path = os.path.join(os.getcwd(), "test_roms", "clear_display.ch8")
-        interpreter = Interpreter(path, False)
+        interpreter = self.load("clear_display.ch8")
         interpreter.display = [1] * len(interpreter.display)
         interpreter.tick()
         self.assertTrue(not any(interpreter.display), F"Expected cleared display. Got {interpreter.display}")
 
     def test_OP_00EE(self):  # RET: Return from a subroutine
-        path = os.path.join(os.getcwd(), "test_roms", "return_from_subroutine.ch8")
-        interpreter = Interpreter(path, False)
-        interpreter.stack = [0x300] + [0x200] * 15
-        interpreter.stack_pointer = 1
+        interpreter = self.load("return_from_subroutine.ch8")
+        interpreter.stack = [0x300]
         interpreter.tick()
-        correct = [0x300, 0x202] + [0x200] * 14
-        self.assertEqual(interpreter.stack, correct)
+        self.assertEqual(interpreter.program_counter, 0x300)
+        self.assertEqual(interpreter.stack, [])
         self.assertEqual(interpreter.stack_pointer, 0)
 
+    def test_OP_00EE_underflow(self):
+        interpreter = self.load("return_from_subroutine.ch8")
+        self.assertRaises(StackUnderflow, interpreter.tick)
+        self.assertEqual(interpreter.program_counter, 0x200)  # Left on the RET that trapped
+
     def test_OP_1nnn(self):  # JP addr: Jump to location nnn
-        path = os.path.join(os.getcwd(), "test_roms", "jump.ch8")
-        interpreter = Interpreter(path, False)
+        interpreter = self.load("jump.ch8")
         interpreter.tick()
         self.assertEqual(interpreter.program_counter, 0x212)
 
     def test_OP_2nnn(self):  # CALL addr: Call subroutine at nnn
-        path = os.path.join(os.getcwd(), "test_roms", "call_subroutine.ch8")
-        interpreter = Interpreter(path, False)
+        interpreter = self.load("call_subroutine.ch8")
         interpreter.tick()
-        correct = [0x202, 0x204] + [0x200] * 14
-        self.assertEqual(interpreter.stack, correct)
+        self.assertEqual(interpreter.program_counter, 0x204)
+        self.assertEqual(interpreter.stack, [0x202])
         self.assertEqual(interpreter.stack_pointer, 1)
 
+    def test_OP_2nnn_overflow(self):
+        interpreter = self.load("call_subroutine.ch8")
+        interpreter.stack = [0x300] * Interpreter.STACK_SIZE
+        self.assertRaises(StackOverflow, interpreter.tick)
+        self.assertEqual(interpreter.program_counter, 0x200)
+        self.assertEqual(len(interpreter.stack), Interpreter.STACK_SIZE)
+
     def test_OP_3xkk(self):  # SE Vx, byte: Skip next instruction if Vx = kk
-        path = os.path.join(os.getcwd(), "test_roms", "SE.ch8")
-        interpreter = Interpreter(path, False)
+        interpreter = self.load("SE.ch8")
         interpreter.registers[0] = 10
         interpreter.tick()
         self.assertEqual(interpreter.program_counter, 0x204)
 
     def test_OP_4xkk(self):  # SNE Vx, byte: Skip next instruction if Vx != kk
-        path = os.path.join(os.getcwd(), "test_roms", "SNE.ch8")
-        interpreter = Interpreter(path, False)
+        interpreter = self.load("SNE.ch8")
         interpreter.registers[0] = 11
         interpreter.tick()
         self.assertEqual(interpreter.program_counter, 0x204)
 
     def test_OP_5xy0(self):  # SE Vx, Vy: Skip next instruction if Vx = Vy
-        path = os.path.join(os.getcwd(), "test_roms", "SE_Vx_Vy.ch8")
-        interpreter = Interpreter(path, False)
+        interpreter = self.load("SE_Vx_Vy.ch8")
         interpreter.tick()
         self.assertEqual(interpreter.program_counter, 0x204)
 
     def test_OP_6xkk(self):  # LD Vx, byte: Set Vx = kk
-        path = os.path.join(os.getcwd(), "test_roms", "LD_Vx_byte.ch8")
-        interpreter = Interpreter(path, False)
+        interpreter = self.load("LD_Vx_byte.ch8")
         interpreter.tick()
         self.assertEqual(interpreter.registers[1], 0xAA)
 
     def test_OP_7xkk(self):  # ADD Vx, byte: Set Vx = Vx + kk
-        path = os.path.join(os.getcwd(), "test_roms", "Add_Vx_byte.ch8")
-        interpreter = Interpreter(path, False)
+        interpreter = self.load("Add_Vx_byte.ch8")
         interpreter.registers[1] = 0x1
         interpreter.tick()
         self.assertEqual(interpreter.registers[1], 0x1 + 0xAA)
 
     def test_OP_8xy0(self):  # LD Vx, Vy: Set Vx = Vy
-        path = os.path.join(os.getcwd(), "test_roms", "Ld_Vx_Vy.ch8")
-        interpreter = Interpreter(path, False)
+        interpreter = self.load("Ld_Vx_Vy.ch8")
         interpreter.registers[1] = 0x1
         interpreter.registers[2] = 0xA
         interpreter.tick()
         self.assertEqual(interpreter.registers[1], 0xA)
 
     def test_OP_8xy1(self):  # OR Vx, Vy: Set Vx = Vx OR Vy
-        path = os.path.join(os.getcwd(), "test_roms", "OR.ch8")
-        interpreter = Interpreter(path, False)
+        interpreter = self.load("OR.ch8")
         interpreter.registers[1] = 0b10101
         interpreter.registers[2] = 0b11000
         interpreter.tick()
         self.assertEqual(interpreter.registers[1], 0b11101)
 
     def test_OP_8xy2(self):  # AND Vx, Vy: Set Vx = Vx AND Vy
-        path = os.path.join(os.getcwd(), "test_roms", "AND.ch8")
-        interpreter = Interpreter(path, False)
+        interpreter = self.load("AND.ch8")
         interpreter.registers[1] = 0b10101
         interpreter.registers[2] = 0b01100
         interpreter.tick()
         self.assertEqual(interpreter.registers[1], 0b00100)
 
     def test_OP_8xy3(self):  # XOR Vx, Vy: Set Vx = Vx XOR Vy
-        path = os.path.join(os.getcwd(), "test_roms", "XOR.ch8")
-        interpreter = Interpreter(path, False)
+        interpreter = self.load("XOR.ch8")
         interpreter.registers[1] = 0b10101
         interpreter.registers[2] = 0b01100
         interpreter.tick()
         self.assertEqual(interpreter.registers[1], 0b11001)
 
     def test_OP_8xy4(self):  # ADD Vx, Vy: Set Vx = Vx + Vy, set VF = carry
-        path = os.path.join(os.getcwd(), "test_roms", "ADD_Vx_Vy.ch8")
-        interpreter = Interpreter(path, False)
+        interpreter = self.load("ADD_Vx_Vy.ch8")
         interpreter.registers[1] = 255
         interpreter.registers[2] = 3
         interpreter.tick()
@@ -136,8 +163,7 @@ class Test(unittest.TestCase):
         self.assertEqual(interpreter.registers[0xF], 1)
 
     def test_OP_8xy5(self):  # SUB Vx, Vy: Set Vx = Vx - Vy, set VF = NOT borrow
-        path = os.path.join(os.getcwd(), "test_roms", "SUB_Vx_Vy.ch8")
-        interpreter = Interpreter(path, False)
+        interpreter = self.load("SUB_Vx_Vy.ch8")
         interpreter.registers[1] = 3
         interpreter.registers[2] = 5
         interpreter.tick()
@@ -145,62 +171,54 @@ class Test(unittest.TestCase):
         self.assertEqual(interpreter.registers[0xF], 0)
 
     def test_OP_8xy6(self):  # SHR Vx {, Vy}: Set Vx = Vx SHR 1
-        path = os.path.join(os.getcwd(), "test_roms", "SHR_VX.ch8")
-        interpreter = Interpreter(path, False)
+        interpreter = self.load("SHR_VX.ch8")
         interpreter.registers[1] = 0b101
         interpreter.tick()
         self.assertEqual(interpreter.registers[1], 0b10)  # Should wrap
         self.assertEqual(interpreter.registers[0xF], 1)
 
     def test_OP_8xy7(self):  # SUBN Vx, Vy: Set Vx = Vy - Vx, set VF = NOT borrow
-        path = os.path.join(os.getcwd(), "test_roms", "SHR_VX.ch8")
-        interpreter = Interpreter(path, False)
+        interpreter = self.load("SHR_VX.ch8")
         interpreter.registers[1] = 0b101
         interpreter.tick()
         self.assertEqual(interpreter.registers[1], 0b10)  # Should wrap
         self.assertEqual(interpreter.registers[0xF], 1)
 
     def test_OP_8xyE(self):  # SHL Vx {, Vy}: Set Vx = Vx SHL 1
-        path = os.path.join(os.getcwd(), "test_roms", "SHL_VX.ch8")
-        interpreter = Interpreter(path, False)
+        interpreter = self.load("SHL_VX.ch8")
         interpreter.registers[1] = 129
         interpreter.tick()
         self.assertEqual(interpreter.registers[1], 2)  # Should wrap
         self.assertEqual(interpreter.registers[0xF], 1)
 
     def test_OP_9xy0(self):  # SNE Vx, Vy: Skip next instruction if Vx != Vy
-        path = os.path.join(os.getcwd(), "test_roms", "SNE_Vx_Vy.ch8")
-        interpreter = Interpreter(path, False)
+        interpreter = self.load("SNE_Vx_Vy.ch8")
         interpreter.registers[1] = 1
         interpreter.tick()
         self.assertEqual(interpreter.program_counter, 0x204)
 
     def test_OP_Annn(self):  # LD I, addr: Set I = nnn
-        path = os.path.join(os.getcwd(), "test_roms", "LD_I_addr.ch8")
-        interpreter = Interpreter(path, False)
+        interpreter = self.load("LD_I_addr.ch8")
         interpreter.tick()
         self.assertEqual(interpreter.index_register, 0xABC)
 
     def test_OP_Bnnn(self):  # P V0, addr: Jump to location nnn + V0
-        path = os.path.join(os.getcwd(), "test_roms", "P_V0_addr.ch8")
-        interpreter = Interpreter(path, False)
+        interpreter = self.load("P_V0_addr.ch8")
         interpreter.registers[0] = 0x4
         interpreter.tick()
         self.assertEqual(interpreter.program_counter, 0xABC + 0x4)
 
     def test_OP_Cxkk(self):  # RND Vx, byte: Set Vx = random byte AND kk
-        patch('Interpreter.getrandbits', lambda _: 0b10101010).start()
-        path = os.path.join(os.getcwd(), "test_roms", "RND_Vx_byte.ch8")
-        interpreter = Interpreter(path, False)
+        patch.object(core, 'getrandbits', lambda _: 0b10101010).start()
+        interpreter = self.load("RND_Vx_byte.ch8")
         interpreter.tick()
         self.assertEqual(interpreter.registers[1], 0b10101010 & 0b1100)
         patch.stopall()
 
     def test_OP_Dxyn(
             self):  # DRW Vx, Vy, nibble: Display n-byte sprite starting at memory location I at (Vx, Vy), set VF = collision
-        path = os.path.join(os.getcwd(), "test_roms", "DRW_Vx_Vy.ch8")
         BYTES_PER_DIGIT = 5
-        interpreter = Interpreter(path, False)
+        interpreter = self.load("DRW_Vx_Vy.ch8")
         interpreter.index_register = 0x50
         interpreter.tick()
         guess = []
@@ -210,8 +228,7 @@ class Test(unittest.TestCase):
         self.assertEqual(guess, correct)
 
     def test_OP_Ex9E(self):  # SKP Vx: Skip next instruction if key with the value of Vx is pressed
-        path = os.path.join(os.getcwd(), "test_roms", "SKP_Vx.ch8")
-        interpreter = Interpreter(path, False)
+        interpreter = self.load("SKP_Vx.ch8")
         interpreter.registers[1] = interpreter.input_map['a']
         interpreter.tick()
         self.assertEqual(interpreter.program_counter, 0x202)
@@ -220,8 +237,7 @@ class Test(unittest.TestCase):
         self.assertEqual(interpreter.program_counter, 0x206)
 
     def test_OP_ExA1(self):  # SKNP Vx: Skip next instruction if key with the value of Vx is not pressed
-        path = os.path.join(os.getcwd(), "test_roms", "SKNP_Vx.ch8")
-        interpreter = Interpreter(path, False)
+        interpreter = self.load("SKNP_Vx.ch8")
         interpreter.registers[1] = interpreter.input_map['a']
         with patch('pygame.key.get_pressed', lambda : self.FAKE_KEYSTROKES):
             interpreter.tick()
@@ -230,15 +246,13 @@ class Test(unittest.TestCase):
         self.assertEqual(interpreter.program_counter, 0x206)
 
     def test_OP_Fx07(self):  # LD Vx, DT: Set Vx = delay timer value
-        path = os.path.join(os.getcwd(), "test_roms", "Ld_Vx_DT.ch8")
-        interpreter = Interpreter(path, False)
+        interpreter = self.load("Ld_Vx_DT.ch8")
         interpreter.delay_timer = 99
         interpreter.tick()
         self.assertEqual(interpreter.registers[1], 99)
 
     def test_OP_Fx0A(self):  # LD Vx, K: Wait for a key press, store the value of the key in Vx
-        path = os.path.join(os.getcwd(), "test_roms", "LD_Vx_k.ch8")
-        interpreter = Interpreter(path, False)
+        interpreter = self.load("LD_Vx_k.ch8")
         for _ in range(10):
             interpreter.tick()
             self.assertEqual(interpreter.program_counter, 0x200)
@@ -248,45 +262,39 @@ class Test(unittest.TestCase):
         self.assertEqual(interpreter.registers[1], interpreter.input_map['a'])
 
     def test_OP_Fx15(self):  # LD DT, Vx: Set delay timer = Vx
-        path = os.path.join(os.getcwd(), "test_roms", "LD_DT.ch8")
-        interpreter = Interpreter(path, False)
+        interpreter = self.load("LD_DT.ch8")
         interpreter.tick()
         self.assertEqual(interpreter.delay_timer, interpreter.registers[1])
 
     def test_OP_Fx18(self):  # LD ST, Vx: Set sound timer = Vx
-        path = os.path.join(os.getcwd(), "test_roms", "LD_ST.ch8")
-        interpreter = Interpreter(path, False)
+        interpreter = self.load("LD_ST.ch8")
         interpreter.tick()
         self.assertEqual(interpreter.sound_timer, interpreter.registers[1])
 
     def test_OP_Fx1E(self):  # ADD I, Vx: Set I = I + Vx
-        path = os.path.join(os.getcwd(), "test_roms", "ADD_I_Vx.ch8")
-        interpreter = Interpreter(path, False)
+        interpreter = self.load("ADD_I_Vx.ch8")
         interpreter.index_register = 2
         interpreter.registers[1] = 3
         interpreter.tick()
         self.assertEqual(interpreter.index_register, 5)
 
     def test_OP_Fx29(self):  # LD F, Vx: Set I = location of sprite for digit Vx
-        path = os.path.join(os.getcwd(), "test_roms", "LD_F_Vx.ch8")
         BYTES_PER_DIGIT = 5
-        interpreter = Interpreter(path, False)
+        interpreter = self.load("LD_F_Vx.ch8")
         interpreter.registers[1] = 3
         interpreter.tick()
         self.assertEqual(interpreter.index_register,
                          interpreter.FONT_SET_START_ADDRESS + (interpreter.registers[1] * BYTES_PER_DIGIT))
 
     def test_OP_Fx33(self):  # LD B, Vx: Store BCD representation of Vx in memory locations I, I+1, and I+2
-        path = os.path.join(os.getcwd(), "test_roms", "LD_B_Vx.ch8")
-        interpreter = Interpreter(path, False)
+        interpreter = self.load("LD_B_Vx.ch8")
         interpreter.registers[0xA] = 123
         interpreter.index_register = 0x300
         interpreter.tick()
         self.assertEqual(interpreter.memory[0x300:0x303], [1, 2, 3])
 
     def test_OP_Fx55(self):  # LD [I], Vx: Store registers V0 through Vx in memory starting at location I
-        path = os.path.join(os.getcwd(), "test_roms", "LD_I_Vx.ch8")
-        interpreter = Interpreter(path, False)
+        interpreter = self.load("LD_I_Vx.ch8")
         interpreter.registers[:0xC] = [1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12]
         interpreter.index_register = interpreter.MEMORY_START_ADDRESS + 0x100
         interpreter.tick()
@@ -295,12 +303,811 @@ class Test(unittest.TestCase):
         self.assertEqual(interpreter.registers[:0xC], interpreter.memory[start:end])
 
     def test_OP_Fx65(self):  # LD Vx, [I]: Read registers V0 through Vx from memory starting at location I
-        path = os.path.join(os.getcwd(), "test_roms", "LD_Vx_I.ch8")
-        interpreter = Interpreter(path, False)
+        interpreter = self.load("LD_Vx_I.ch8")
         interpreter.index_register = interpreter.MEMORY_START_ADDRESS
         interpreter.tick()
         correct = [0xFC, 0x65, 0x01, 0x23, 0x45, 0x67, 0x89, 0x10, 0x11, 0x12, 0x13, 0x14, 0x15, 0x0, 0x0, 0x0]
         self.assertEqual(interpreter.registers, correct)
 
+
+class QuirksTest(unittest.TestCase):
+
+    def setUp(self):
+        patch('pygame.display.set_mode', lambda *_: None).start()
+        patch('pygame.display.update', lambda _: None).start()
+        patch('pygame.draw.rect', lambda a, b, c: None).start()
+        patch('Interpreter.Interpreter.draw', lambda *_: None).start()
+        self.NO_QUIRKS = MODERN
+
+    def tearDown(self):
+        patch.stopall()
+
+    def with_quirk(self, **quirk):
+        return self.NO_QUIRKS._replace(**quirk)
+
+    def test_profiles(self):
+        self.assertEqual(get_profile("VIP"), COSMAC_VIP)
+        self.assertEqual(profile_for_rom(os.path.join("Roms", "BLITZ")), COSMAC_VIP)
+        self.assertEqual(profile_for_rom(os.path.join("Roms", "PONG")), MODERN)
+        self.assertRaises(ValueError, get_profile, "nope")
+
+    def test_shift_uses_vy(self):  # 8106: SHR V1, V0
+        path = os.path.join(os.getcwd(), "test_roms", "SHR_VX.ch8")
+        interpreter = Interpreter(path, False, self.with_quirk(shift_uses_vy=True))
+        interpreter.registers[0] = 0b111
+        interpreter.registers[1] = 0b100
+        interpreter.tick()
+        self.assertEqual(interpreter.registers[1], 0b11)
+        self.assertEqual(interpreter.registers[0xF], 1)
+
+    def test_load_store_increments_i(self):  # FC55: LD [I], VC
+        path = os.path.join(os.getcwd(), "test_roms", "LD_I_Vx.ch8")
+        interpreter = Interpreter(path, False, self.with_quirk(load_store_increments_i=True))
+        interpreter.index_register = 0x300
+        interpreter.tick()
+        self.assertEqual(interpreter.index_register, 0x300 + 0xC + 1)
+
+    def test_load_store_increments_i_by_x(self):  # FC55 under CHIP-48
+        path = os.path.join(os.getcwd(), "test_roms", "LD_I_Vx.ch8")
+        interpreter = Interpreter(path, False, get_profile("chip48"))
+        interpreter.index_register = 0x300
+        interpreter.tick()
+        self.assertEqual(interpreter.index_register, 0x300 + 0xC)
+
+    def test_jump_uses_vx(self):  # BABC: JP VA, 0xABC
+        path = os.path.join(os.getcwd(), "test_roms", "P_V0_addr.ch8")
+        interpreter = Interpreter(path, False, self.with_quirk(jump_uses_vx=True))
+        interpreter.registers[0] = 0x1
+        interpreter.registers[0xA] = 0x4
+        interpreter.tick()
+        self.assertEqual(interpreter.program_counter, 0xABC + 0x4)
+
+    def test_logic_resets_vf(self):  # 8121: OR V1, V2
+        path = os.path.join(os.getcwd(), "test_roms", "OR.ch8")
+        interpreter = Interpreter(path, False, self.with_quirk(logic_resets_vf=True))
+        interpreter.registers[0xF] = 1
+        interpreter.tick()
+        self.assertEqual(interpreter.registers[0xF], 0)
+
+    def test_clip_sprites(self):  # D005: DRW V0, V0, 5
+        path = os.path.join(os.getcwd(), "test_roms", "DRW_Vx_Vy.ch8")
+        wrapped = Interpreter(path, False, self.with_quirk(clip_sprites=False))
+        clipped = Interpreter(path, False, self.with_quirk(clip_sprites=True))
+        for interpreter in (wrapped, clipped):
+            interpreter.index_register = 0x50  # "0" glyph, whose top row is 0xF0
+            interpreter.registers[0] = 62
+            interpreter.tick()
+        top_row = 30 * Interpreter.CHIP8_WIDTH
+        self.assertEqual(wrapped.display[top_row + 62: top_row + 64], [1, 1])
+        self.assertEqual(wrapped.display[top_row: top_row + 2], [1, 1])
+        self.assertEqual(clipped.display[top_row + 62: top_row + 64], [1, 1])
+        self.assertEqual(clipped.display[top_row: top_row + 2], [0, 0])
+        self.assertFalse(any(clipped.display[:Interpreter.CHIP8_WIDTH]))
+
+
+class TimingTest(unittest.TestCase):
+
+    def run_rom(self, rom, steps, timing=COSMAC_VIP_TIMING):
+        interpreter = Interpreter(None, False, headless=True, rom=bytes(rom), timing=timing)
+        for _ in range(steps):
+            interpreter.step()
+        return interpreter
+
+    def test_untimed_instructions_cost_one_cycle(self):
+        interpreter = self.run_rom([0x12, 0x00], 25, None)
+        self.assertEqual(interpreter.cycles, 25)
+        self.assertEqual(interpreter.frames, 2)
+        self.assertAlmostEqual(interpreter.emulated_seconds, 25 / Interpreter.INSTRUCTIONS_PER_SECOND)
+
+    def test_per_opcode_costs(self):
+        costs = COSMAC_VIP_TIMING.costs
+        self.assertEqual(self.run_rom([0x60, 0x01], 1).cycles, costs["6xkk"])  # LD V0, 1
+        self.assertEqual(self.run_rom([0x80, 0x14], 1).cycles, costs["8xy4"])  # ADD V0, V1
+        self.assertEqual(self.run_rom([0xF3, 0x55], 1).cycles,  # LD [I], V3: costs more for every register stored
+                         costs["Fx55"] + 4 * COSMAC_VIP_TIMING.per_register)
+
+    def test_draw_waits_for_vblank(self):
+        timing = COSMAC_VIP_TIMING
+        interpreter = self.run_rom([0x60, 0x01, 0xD0, 0x05], 2)  # LD V0, 1; DRW V0, V0, 5
+        self.assertEqual(interpreter.frames, 1)
+        self.assertEqual(interpreter.cycles, timing.cycles_per_frame + timing.costs["Dxyn"] + 5 * timing.per_row)
+
+        no_wait = timing._replace(draw_waits_for_vblank=False)
+        interpreter = self.run_rom([0x60, 0x01, 0xD0, 0x05], 2, no_wait)
+        self.assertEqual(interpreter.frames, 0)
+        self.assertEqual(interpreter.cycles, timing.costs["6xkk"] + timing.costs["Dxyn"] + 5 * timing.per_row)
+
+    def test_timers_follow_cycles(self):
+        interpreter = self.run_rom([0x12, 0x00], 0)  # JP 0x200
+        interpreter.delay_timer = 10
+        jumps_per_frame = -(-(COSMAC_VIP_TIMING.cycles_per_frame - COSMAC_VIP_TIMING.interrupt_cycles) //
+                            COSMAC_VIP_TIMING.costs["1nnn"])
+        for _ in range(jumps_per_frame * 3):
+            interpreter.step()
+        self.assertEqual(interpreter.frames, 3)
+        self.assertEqual(interpreter.delay_timer, 7)
+
+    def test_unknown_model(self):
+        self.assertEqual(get_timing("VIP"), COSMAC_VIP_TIMING)
+        self.assertRaises(ValueError, get_timing, "nope")
+
+
+class TracerTest(unittest.TestCase):
+
+    # LD I, 0x300; LD V2, 7; LD [I], V2; DRW V0, V1, 3; LD V1, [I]; JP 0x20A
+    ROM = [0xA3, 0x00, 0x62, 0x07, 0xF2, 0x55, 0xD0, 0x13, 0xF1, 0x65, 0x12, 0x0A]
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "trace.bin")
+
+    def trace(self, steps, **interpreter_args):
+        with Tracer(self.path, buffer_size=16) as tracer:
+            interpreter = Interpreter(None, False, headless=True, rom=bytes(self.ROM), tracer=tracer,
+                                      **interpreter_args)
+            for _ in range(steps):
+                interpreter.step()
+        return interpreter
+
+    def test_records(self):
+        self.trace(6)
+        self.assertEqual(list(read_trace(self.path)), [
+            Record(INSTRUCTION, 0x200, 0xA300),
+            Record(INSTRUCTION, 0x202, 0x6207),
+            Record(INSTRUCTION, 0x204, 0xF255),
+            Record(WRITE, 0x300, 3),
+            Record(INSTRUCTION, 0x206, 0xD013),
+            Record(READ, 0x300, 3),
+            Record(INSTRUCTION, 0x208, 0xF165),
+            Record(READ, 0x300, 2),
+            Record(INSTRUCTION, 0x20A, 0x120A),
+        ])
+
+    def test_records_unknown_opcodes(self):
+        self.ROM = [0x60, 0x01, 0xE0, 0x00]  # LD V0, 1; an E opcode with no instruction
+        self.assertRaises(KeyError, self.trace, 2)
+        self.assertEqual(list(read_trace(self.path)), [Record(INSTRUCTION, 0x200, 0x6001),
+                                                       Record(INSTRUCTION, 0x202, 0xE000)])
+
+    def test_traces_under_quirks_and_timing(self):
+        interpreter = self.trace(6, quirks=COSMAC_VIP, timing=COSMAC_VIP_TIMING)
+        records = list(read_trace(self.path))
+        self.assertEqual(len(records), 9)
+        self.assertEqual(records[7], Record(READ, 0x303, 2))  # Fx55 left I past the registers it stored
+        self.assertEqual(interpreter.frames, 1)  # The DRW still waited for the display interrupt
+
+    def test_appends_and_streams_in_chunks(self):
+        self.trace(2)
+        self.trace(2)
+        self.assertEqual([record.address for record in read_trace(self.path, chunk_records=3)],
+                         [0x200, 0x202, 0x200, 0x202])
+
+    def test_rejects_other_files(self):
+        with open(self.path, "wb") as f:
+            f.write(b"not a trace")
+        self.assertRaises(ValueError, list, read_trace(self.path))
+        self.assertRaises(ValueError, Tracer, self.path)
+
+
+class BrokenBCD(Interpreter):  # Stores the ones digit wrong, which only shows up in memory
+
+    def OP_Fx33(self):
+        super().OP_Fx33()
+        if self.registers[(self.op_code & 0x0F00) >> 8] % 10 == 7:
+            self.memory[self.index_register + 2] = 0
+
+
+class LockstepTest(unittest.TestCase):
+
+    def machines(self, rom, a=None, b=None, cls=Interpreter):
+        return (Interpreter(None, False, a, headless=True, rom=bytes(rom)),
+                cls(None, False, b, headless=True, rom=bytes(rom)))
+
+    def test_identical_runs(self):
+        with open(os.path.join("Roms", "PONG"), "rb") as f:
+            rom = f.read()
+        random.seed(1)
+        self.assertIsNone(Lockstep(*self.machines(rom)).run(100))
+
+    def test_shared_random_numbers(self):
+        self.assertIsNone(Lockstep(*self.machines([0xC0, 0xFF, 0xC1, 0xFF, 0x12, 0x00])).run(5))  # RND V0; RND V1
+
+    def test_register_divergence(self):
+        rom = [0x60, 0x01, 0x61, 0x04, 0x80, 0x16, 0x12, 0x06]  # LD V0, 1; LD V1, 4; SHR V0, V1
+        divergence = Lockstep(*self.machines(rom, COSMAC_VIP, MODERN)).run(5)
+        self.assertEqual(divergence.instruction, 3)
+        self.assertEqual(divergence.frame, 0)
+        self.assertEqual(divergence.differences, ["V0: 0x02 != 0x00", "VF: 0x00 != 0x01"])
+
+    def test_memory_divergence_is_pinned_to_its_instruction(self):
+        # LD I, 0x300; LD V0, 6; ADD V0 twelve times, only the last adding 1; LD B, V0 in the middle of frame 1
+        rom = [0xA3, 0x00, 0x60, 0x06, 0x70, 0x00] + [0x70, 0x00] * 10 + [0x70, 0x01, 0xF0, 0x33, 0x12, 0x1E]
+        lockstep = Lockstep(*self.machines(rom, cls=BrokenBCD))
+        divergence = lockstep.run(10)
+        self.assertEqual(divergence.instruction, 15)
+        self.assertEqual(divergence.frame, 1)
+        self.assertEqual(divergence.differences, ["memory[0x302]: 0x07 != 0x00"])
+
+    def test_different_timing_models(self):  # The frames and timers drift apart, the CPU does not
+        # LD I, 0x300; ADD V0, 1; LD B, V0; LD F, V0; DRW V1, V1, 5; JP 0x202
+        rom = [0xA3, 0x00, 0x70, 0x01, 0xF0, 0x33, 0xF0, 0x29, 0xD1, 0x15, 0x12, 0x02]
+        a = Interpreter(None, False, headless=True, rom=bytes(rom))
+        b = Interpreter(None, False, headless=True, rom=bytes(rom), timing=COSMAC_VIP_TIMING)
+        lockstep = Lockstep(a, b)
+        self.assertIsNone(lockstep.run(20))
+        self.assertNotEqual(a.frames, b.frames)
+        self.assertNotIn("frames", lockstep.state)
+
+    def test_error_in_one_machine(self):
+        a, b = self.machines([0x60, 0x01, 0x12, 0x00], MODERN, MODERN)
+        b.memory[0x202] = 0xF0
+        b.memory[0x203] = 0xFF  # Not an instruction
+        divergence = Lockstep(a, b).run(5)
+        self.assertEqual(divergence.instruction, 1)
+        self.assertIn("memory[0x202]: 0x12 != 0xf0", divergence.differences)
+
+
+class AssemblerTest(unittest.TestCase):
+
+    def test_every_instruction(self):
+        operands = {"Vx": "V1", "Vy": "V2", "byte": "0x34", "addr": "0x567", "nibble": "8", "{": "", "}": ""}
+        fields = {"x": "1", "y": "2", "kk": "34", "nnn": "567", "n": "8"}
+        for pattern, syntax in op_code_map.items():
+            with self.subTest(syntax):
+                source = syntax
+                for kind, operand in operands.items():
+                    source = source.replace(kind, operand)
+                expected = pattern
+                for field, value in fields.items():
+                    expected = expected.replace(field, value)
+                self.assertEqual(assemble(source).hex(), expected.lower())
+
+    def test_shift_without_vy_shifts_in_place(self):
+        self.assertEqual(assemble("SHR V3\nSHL V4").hex(), "8336844e")
+
+    def test_labels_and_data(self):
+        rom = assemble("""
+        start:  JP end          ; forward reference
+        data:   DB 1, 0x02, 0b11
+                DW 0xABCD, data
+                DS 3, 0xFF
+        end:    LD I, data + 1
+                JP start
+        """)
+        self.assertEqual(rom.hex(), "120c" "010203" "abcd0202" "ffffff" "a203" "1200")
+
+    def test_ds_count_from_labels_above(self):
+        self.assertEqual(assemble("start: CLS\nend: DS end - start + 1, 0xAA\nJP start").hex(), "00e0" "aaaaaa" "1200")
+
+    def test_errors(self):
+        for source, message in [("NOP", "unknown instruction"), ("LD V1", "expected LD"), ("LD V1, 0x100", "fit"),
+                                ("JP nowhere", "unknown label"), ("a: CLS\na: CLS", "already defined"),
+                                ("DRW V0, V1, 16", "nibble"), ("DS 4000", "does not fit"),
+                                ("DS end - start\nstart: CLS\nend:", "labels defined above")]:
+            with self.subTest(source):
+                with self.assertRaisesRegex(AssemblyError, message):
+                    assemble(source)
+
+    def test_test_roms_match_their_sources(self):
+        directory = os.path.join(os.getcwd(), "test_roms")
+        for name in sorted(os.listdir(directory)):
+            if name.endswith(".asm"):
+                with self.subTest(name), open(os.path.join(directory, name)) as source:
+                    with open(os.path.join(directory, name[:-4] + ".ch8"), "rb") as rom:
+                        self.assertEqual(assemble(source.read()), rom.read())
+
+    def test_workloads_run(self):
+        directory = os.path.join(os.getcwd(), "workloads")
+        for name in sorted(os.listdir(directory)):
+            with self.subTest(name), open(os.path.join(directory, name)) as source:
+                interpreter = Interpreter(None, False, headless=True, rom=assemble(source.read()))
+                for _ in range(2000):
+                    interpreter.step()
+
+
+class CallStackTest(unittest.TestCase):
+
+    def run_source(self, source, steps, **interpreter_args):
+        interpreter = Interpreter(None, False, headless=True, rom=assemble(source), **interpreter_args)
+        for _ in range(steps):
+            interpreter.step()
+        return interpreter
+
+    def test_recursion_overflows(self):
+        with self.assertRaises(StackOverflow):
+            self.run_source("loop: CALL loop", 100)
+
+    def test_loads_old_states(self):  # The PC used to be the top of a fixed 16 entry stack
+        interpreter = self.run_source("CALL sub\nsub: JP sub", 1)
+        state = interpreter.get_state()
+        del state["program_counter"]
+        state["stack"] = [0x202, 0x202] + [0x200] * 14
+        state["stack_pointer"] = 1
+        interpreter.set_state(state)
+        self.assertEqual((interpreter.program_counter, interpreter.stack), (0x202, [0x202]))
+
+    def test_call_profile(self):
+        profiler = CallProfiler()
+        self.run_source("""
+        main:   CALL outer
+                CALL inner
+                JP main
+        outer:  CALL inner
+                LD V0, 1
+                RET
+        inner:  LD V1, 2
+                RET
+        """, 30, profiler=profiler)
+        outer, inner = 0x206, 0x20C
+        self.assertEqual(profiler.calls, {outer: 3, inner: 6})
+        self.assertEqual(profiler.callers, {(None, outer): 3, (outer, inner): 3, (None, inner): 3})
+        self.assertEqual(profiler.total_cycles[inner], 6 * 2)  # LD and RET, every call
+        self.assertEqual(profiler.total_cycles[outer], 3 * 5)  # CALL, inner's two, LD and RET
+        self.assertEqual(profiler.self_cycles[outer], 3 * 3)
+        self.assertIn("0x206", profiler.report())
+
+
+class CoreTest(unittest.TestCase):  # Run the suite again with CHIPY8_PURE_PYTHON=1 to test the other core
+
+    def test_pure_python_fallback(self):
+        with patch.dict(os.environ, {"CHIPY8_PURE_PYTHON": "1"}):
+            self.assertEqual(load_core().__name__, "Core")
+
+    def test_stale_build_is_ignored(self):
+        class Stale:
+            SOURCE_DIGEST = "built from an older Core.py"
+
+        with patch.dict("sys.modules", {"CompiledCore": Stale}), patch.dict(os.environ, {"CHIPY8_PURE_PYTHON": ""}):
+            self.assertEqual(load_core().__name__, "Core")
+
+    def test_interpreter_extends_core(self):
+        interpreter = Interpreter(None, False, headless=True, rom=assemble("LD V3, 7"))
+        interpreter.step()
+        self.assertIsInstance(interpreter, core.Core)
+        self.assertEqual((interpreter.registers[3], interpreter.program_counter), (7, 0x202))
+
+
+class NetplayTest(unittest.TestCase):  # Server and clients talk over loopback, all on this thread
+    SOURCE = """
+            LD V1, 5
+    loop:   SKNP V1         ; wait for key 5, then draw a 5 and beep
+            JP pressed
+            JP loop
+    pressed:LD F, V1
+            DRW V2, V2, 5
+            LD ST, V1
+    halt:   JP halt
+    """
+
+    def setUp(self):
+        self.interpreter = Interpreter(None, False, headless=True, rom=assemble(self.SOURCE))
+        self.server = NetplayServer(self.interpreter, port=0)
+        self.addCleanup(self.server.close)
+        self.clients = []
+
+    def connect(self):
+        client = NetplayClient(*self.server.address)
+        self.addCleanup(client.close)
+        self.poll_until(lambda: len(self.server.connections) == len(self.clients) + 1)
+        self.clients.append(client)
+        return client
+
+    def poll_until(self, condition):
+        for _ in range(500):
+            if condition():
+                return
+            self.server.poll(0.01)
+        self.fail("timed out")
+
+    def frame(self):
+        self.server.frame()
+        for client in self.clients:
+            client.receive()
+
+    def test_run_length_encoding(self):
+        for data in (b"", bytes(256), bytes(range(256)), b"\x01\x01\x02" * 100, bytes(300) + b"\xff"):
+            self.assertEqual(rle_decode(rle_encode(data)), data)
+        self.assertEqual(len(rle_encode(bytes(256))), 4)  # An unchanged frame
+        self.assertEqual(len(rle_encode(bytes(range(256)))), 258)
+
+    def test_loopback(self):
+        player = self.connect()
+        for _ in range(5):
+            self.frame()
+        self.assertEqual(player.display, [0] * 2048)
+        self.assertEqual(player.bytes_per_frame, 16)  # 12 byte header and a 4 byte delta
+
+        player.send_keys([int(key == 5) for key in range(16)])
+        self.poll_until(lambda: self.server.keys()[5])
+        self.frame()
+        self.assertEqual(player.display, self.interpreter.display)
+        self.assertEqual(sum(player.display), 14)  # The font's 5
+        self.assertEqual((player.frame, player.sound_timer), (self.interpreter.frames, 4))
+        self.assertEqual(len(player.latencies), 1)
+        self.assertLess(player.latencies[0], 1)
+
+        spectator = self.connect()  # Starts from a blank screen, so its first frame carries the whole picture
+        received = player.bytes_received
+        self.frame()
+        self.assertEqual(spectator.display, self.interpreter.display)
+        self.assertGreater(spectator.bytes_received, 16)
+        self.assertEqual(player.bytes_received - received, 16)
+
+    def test_stalled_server(self):
+        address = F"127.0.0.1:{self.server.address[1]}"
+        with patch("Netplay.watch", side_effect=TimeoutError), patch("sys.stderr"):
+            with self.assertRaises(SystemExit) as exit_:
+                Netplay.main(["connect", address])
+        self.assertEqual(exit_.exception.code, F"{address} stopped sending frames")
+
+    def test_refused(self):
+        with socket.socket() as unused:  # Bound but never listening, so connecting is refused
+            unused.bind(("127.0.0.1", 0))
+            port = unused.getsockname()[1]
+            with self.assertRaises(SystemExit) as exit_:
+                Netplay.main(["connect", F"127.0.0.1:{port}"])
+        self.assertIn("Could not connect", exit_.exception.code)
+
+    def test_disconnect(self):
+        player = self.connect()
+        player.send_keys([1] * 16)
+        self.poll_until(lambda: any(self.server.keys()))
+        player.close()
+        self.poll_until(lambda: not self.server.connections)
+        self.assertEqual(self.server.keys(), [0] * 16)
+
+
+class AudioTest(unittest.TestCase):
+
+    def setUp(self):
+        patch('pygame.display.set_mode', lambda *_: None).start()
+        patch('pygame.display.update', lambda _: None).start()
+        patch('pygame.draw.rect', lambda a, b, c: None).start()
+        patch('Interpreter.Interpreter.draw', lambda *_: None).start()
+
+    def tearDown(self):
+        patch.stopall()
+
+    def test_timers_count_down_at_60hz(self):
+        path = os.path.join(os.getcwd(), "test_roms", "LD_ST.ch8")
+        interpreter = Interpreter(path, False, audio=Beeper(NullSink()))
+        interpreter.registers[1] = 3
+        for _ in range(Interpreter.TICKS_PER_FRAME * 5):
+            interpreter.tick()
+        self.assertEqual(interpreter.sound_timer, 0)
+        self.assertEqual(interpreter.audio.sink.frames, 5)
+        self.assertEqual(interpreter.audio.sink.active_frames, 3)
+
+    def test_wav_sink(self):  # F118: LD ST, V1
+        path = os.path.join(os.getcwd(), "test_roms", "LD_ST.ch8")
+        with tempfile.TemporaryDirectory() as directory:
+            wav_path = os.path.join(directory, "beep.wav")
+            beeper = Beeper(WavSink(wav_path))
+            interpreter = Interpreter(path, False, audio=beeper)
+            interpreter.registers[1] = 2
+            for _ in range(Interpreter.TICKS_PER_FRAME * 3):
+                interpreter.tick()
+            beeper.close()
+
+            with wave.open(wav_path, "rb") as wav:
+                samples_per_frame = wav.getframerate() // Beeper.FRAME_RATE
+                self.assertEqual(wav.getnframes(), samples_per_frame * 3)
+                tone = wav.readframes(samples_per_frame * 2)
+                silence = wav.readframes(samples_per_frame)
+        self.assertTrue(any(tone))
+        self.assertFalse(any(silence))
+
+
+    def test_pygame_sink_closes_after_pygame_quit(self):  # As when the window is closed mid beep
+        with patch.dict(os.environ, {"SDL_AUDIODRIVER": "dummy"}):
+            beeper = Beeper(PygameSink())
+            beeper.frame(True)
+            pygame.mixer.quit()
+            beeper.close()
+
+    def test_state_is_saved_when_audio_fails_to_close(self):
+        with tempfile.TemporaryDirectory() as directory:
+            state_path = os.path.join(directory, "state.json")
+            args = main.parse_args(["PONG", "--headless", "--save-state", state_path])
+            interpreter = main.create_interpreter(args)
+            interpreter.audio = Beeper(NullSink())
+            with patch.object(interpreter.audio, "close", side_effect=pygame.error("mixer not initialized")):
+                self.assertRaises(pygame.error, main.finish, interpreter, args)
+            self.assertTrue(os.path.exists(state_path))
+
+
+class HeadlessTest(unittest.TestCase):
+
+    def test_headless_skips_display(self):
+        with patch('pygame.display.set_mode') as set_mode:
+            interpreter = Interpreter(None, False, headless=True, rom=bytes([0xD0, 0x05]))  # DRW V0, V0, 5
+        set_mode.assert_not_called()
+        interpreter.index_register = Interpreter.FONT_SET_START_ADDRESS
+        interpreter.tick()
+        self.assertEqual(interpreter.display[:4], [1, 1, 1, 1])
+
+    def test_reset(self):
+        interpreter = Interpreter(None, False, headless=True, rom=bytes([0x61, 0xAA]))  # LD V1, 0xAA
+        interpreter.tick()
+        interpreter.display[0] = 1
+        interpreter.reset(bytes([0x62, 0xBB]))  # LD V2, 0xBB
+        self.assertEqual(interpreter.registers[1], 0)
+        self.assertEqual(interpreter.display[0], 0)
+        self.assertEqual(interpreter.program_counter, Interpreter.MEMORY_START_ADDRESS)
+        interpreter.tick()
+        self.assertEqual(interpreter.registers[2], 0xBB)
+        self.assertRaises(ValueError, interpreter.reset, bytes(Interpreter.MEMORY_SIZE))
+
+
+class VMPoolTest(unittest.TestCase):
+
+    def test_reuses_interpreters(self):
+        pool = VMPool(headless=True)
+        path = os.path.join(os.getcwd(), "test_roms", "LD_I_Vx.ch8")
+        with pool.vm(path) as interpreter:
+            interpreter.registers[0] = 0xAB
+            interpreter.index_register = Interpreter.MEMORY_START_ADDRESS
+            interpreter.tick()  # FC55 overwrites the ROM itself
+            self.assertEqual(interpreter.memory[Interpreter.MEMORY_START_ADDRESS], 0xAB)
+        with pool.vm(path) as reused:
+            self.assertIs(reused, interpreter)
+            self.assertEqual(reused.memory[Interpreter.MEMORY_START_ADDRESS:Interpreter.MEMORY_START_ADDRESS + 2],
+                             [0xFC, 0x55])
+            self.assertEqual(reused.registers[0], 0)
+
+    def test_swaps_roms(self):
+        pool = VMPool(headless=True)
+        with pool.vm(rom=bytes([0x61, 0xAA])) as interpreter:
+            interpreter.tick()
+        with pool.vm(rom=bytes([0x00, 0xE0])) as reused:
+            self.assertIs(reused, interpreter)
+            self.assertEqual(reused.memory[Interpreter.MEMORY_START_ADDRESS:Interpreter.MEMORY_START_ADDRESS + 2],
+                             [0x00, 0xE0])
+
+    def test_rereads_rewritten_roms(self):
+        pool = VMPool(headless=True)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "rom.ch8")
+            for mtime, rom in enumerate((bytes([0x61, 0xAA]), bytes([0x00, 0xE0]))):
+                with open(path, "wb") as f:
+                    f.write(rom)
+                os.utime(path, ns=(mtime, mtime))  # Same size, so only the modification time gives it away
+                with pool.vm(path) as interpreter:
+                    self.assertEqual(bytes(interpreter.memory[Interpreter.MEMORY_START_ADDRESS:
+                                                              Interpreter.MEMORY_START_ADDRESS + 2]), rom)
+            with patch("VMPool.open", side_effect=AssertionError("read again"), create=True):
+                pool.acquire(path)  # Unchanged, so served from the cache
+
+    def test_size_limit(self):
+        pool = VMPool(size=1, headless=True)
+        first = pool.acquire(rom=bytes(2))
+        second = pool.acquire(rom=bytes(2))
+        pool.release(first)
+        pool.release(second)
+        self.assertIs(pool.acquire(rom=bytes(2)), first)
+        self.assertIsNot(pool.acquire(rom=bytes(2)), second)
+
+
+class RendererTest(unittest.TestCase):
+
+    def setUp(self):
+        from Renderer import Renderer
+        self.background = Interpreter.BACKGROUND_COLOR
+        self.foreground = Interpreter.FOREGROUND_COLOR
+        self.surface = pygame.Surface((Interpreter.CHIP8_WIDTH * 4 + 10, Interpreter.CHIP8_HEIGHT * 4))
+        self.renderer = Renderer(Interpreter.CHIP8_WIDTH, Interpreter.CHIP8_HEIGHT, self.background, self.foreground)
+        self.display = [0] * (Interpreter.CHIP8_WIDTH * Interpreter.CHIP8_HEIGHT)
+
+    def color_at(self, x, y):
+        return tuple(self.surface.get_at((x, y)))[:3]
+
+    def test_integer_upscaling(self):
+        self.display[0] = 1
+        self.display[-1] = 1
+        area = self.renderer.draw(self.display, self.surface, self.surface.get_rect())
+        self.assertEqual(area, self.surface.get_rect())
+        self.assertEqual(self.color_at(5, 0), self.foreground)  # 4x scale, centred with a 5 pixel border each side
+        self.assertEqual(self.color_at(8, 3), self.foreground)
+        self.assertEqual(self.color_at(9, 0), self.background)
+        self.assertEqual(self.color_at(4, 0), self.background)
+        self.assertEqual(self.color_at(self.surface.get_width() - 6, self.surface.get_height() - 1), self.foreground)
+
+    def test_skips_unchanged_frames(self):
+        self.assertIsNotNone(self.renderer.draw(self.display, self.surface, self.surface.get_rect()))
+        self.assertIsNone(self.renderer.draw(self.display, self.surface, self.surface.get_rect()))
+        self.renderer.invalidate()
+        self.assertIsNotNone(self.renderer.draw(self.display, self.surface, self.surface.get_rect()))
+
+    def test_fade_holds_between_frames(self):  # As the debugger shows single steps
+        from Renderer import Renderer
+        renderer = Renderer(Interpreter.CHIP8_WIDTH, Interpreter.CHIP8_HEIGHT, self.background, self.foreground, 2)
+        area = self.surface.get_rect()
+        self.display[0] = 1
+        renderer.draw(self.display, self.surface, area)
+        self.display[0] = 0
+        renderer.draw(self.display, self.surface, area)
+        for _ in range(10):
+            self.assertIsNone(renderer.draw(self.display, self.surface, area, decay=False))
+        renderer.draw(self.display, self.surface, area)
+        self.assertNotIn(self.color_at(5, 0), (self.foreground, self.background))
+
+    def test_area_smaller_than_framebuffer(self):
+        self.display[0] = 1
+        area = (3, 2, 50, 20)
+        self.assertEqual(self.renderer.draw(self.display, self.surface, area), area)
+        self.assertEqual(self.color_at(3, 2), self.background)
+        self.display[0] = 0
+        self.assertEqual(self.renderer.draw(self.display, self.surface, area), area)
+        self.renderer.invalidate()  # The window grew back
+        self.assertEqual(self.renderer.draw(self.display, self.surface, self.surface.get_rect()),
+                         self.surface.get_rect())
+
+    def test_fade(self):
+        from Renderer import Renderer
+        renderer = Renderer(Interpreter.CHIP8_WIDTH, Interpreter.CHIP8_HEIGHT, self.background, self.foreground, 2)
+        area = self.surface.get_rect()
+        self.display[0] = 1
+        renderer.draw(self.display, self.surface, area)
+        self.display[0] = 0
+        renderer.draw(self.display, self.surface, area)
+        self.assertEqual(self.color_at(5, 0), self.foreground)  # Switched off this frame, starts fading on the next
+        for _ in range(2):
+            renderer.draw(self.display, self.surface, area)
+            self.assertNotIn(self.color_at(5, 0), (self.foreground, self.background))
+        renderer.draw(self.display, self.surface, area)
+        self.assertEqual(self.color_at(5, 0), self.background)
+        self.assertIsNone(renderer.draw(self.display, self.surface, area))
+
+
+class TiledDisplayTest(unittest.TestCase):
+
+    def setUp(self):
+        patch('Renderer.open_window', lambda size, *_: pygame.Surface(size)).start()
+        patch('pygame.display.update', lambda _: None).start()
+        self.addCleanup(patch.stopall)
+        self.pressed = [0] * 512
+        patch('pygame.key.get_pressed', lambda: self.pressed).start()
+
+    def tiled(self, *roms):
+        from TiledDisplay import TiledDisplay
+        interpreters = [Interpreter(None, False, headless=True, rom=rom) for rom in roms]
+        return TiledDisplay(interpreters, scale=2)
+
+    def test_runs_every_tile(self):
+        rom = open(os.path.join("Roms", "MAZE"), "rb").read()
+        tiled = self.tiled(rom, rom, rom)
+        self.assertEqual((tiled.columns, tiled.rows), (2, 2))
+        tiled.run(5)
+        self.assertEqual([interpreter.frames for interpreter in tiled.interpreters], [5, 5, 5])
+        for tile in tiled.tiles:  # MAZE has drawn something into every tile
+            inner = tile.inflate(-2 * tiled.BORDER, -2 * tiled.BORDER)
+            pixels = {tuple(tiled.screen.get_at((x, y)))[:3] for x in range(inner.left, inner.right)
+                      for y in range(inner.top, inner.bottom)}
+            self.assertIn(Interpreter.FOREGROUND_COLOR, pixels)
+
+    def test_keyboard_goes_to_focused_tile(self):
+        rom = bytes([0x12, 0x00])  # Loop forever
+        tiled = self.tiled(rom, rom)
+        tiled.focus = 1
+        code = next(code for code, key in tiled.keys.items() if key == 0x5)
+        self.pressed[code] = 1
+        tiled.frame()
+        self.assertEqual(tiled.interpreters[0].input[0x5], 0)
+        self.assertEqual(tiled.interpreters[1].input[0x5], 1)
+
+    def test_crashed_tile_stops_alone(self):
+        tiled = self.tiled(bytes([0xF0, 0xFF]), bytes([0x12, 0x00]))  # 0xF0FF is not an instruction
+        tiled.run(3)
+        self.assertEqual(list(tiled.crashed), [0])
+        self.assertIsInstance(tiled.crashed[0], KeyError)
+        self.assertEqual(tiled.interpreters[1].frames, 3)
+
+
+class CommandLineTest(unittest.TestCase):
+
+    def run_main(self, *argv):
+        with tempfile.TemporaryDirectory() as directory:
+            dump_path = os.path.join(directory, "dump.json")
+            main.main(list(argv) + ["--dump", dump_path])
+            with open(dump_path) as f:
+                return json.load(f)
+
+    def test_parse_args(self):
+        args = main.parse_args(["PONG", "debug", "--turbo"])
+        self.assertTrue(args.debug)
+        self.assertTrue(args.turbo)
+        self.assertRaises(SystemExit, main.parse_args, ["PONG", "--debug", "--headless"])
+        args = main.parse_args(["PONG", "BLITZ@vip"])
+        self.assertTrue(args.tiled)
+        self.assertEqual(main.parse_rom(args.roms[1])[1], COSMAC_VIP)
+        self.assertRaises(SystemExit, main.parse_args, ["PONG", "BRIX", "--headless"])
+
+    def test_headless_limits(self):
+        self.assertEqual(self.run_main("MAZE", "--headless", "--cycles", "25")["cycles"], 25)
+        dump = self.run_main("MAZE", "--headless", "--frames", "3")
+        self.assertEqual(dump["frames"], 3)
+        self.assertEqual(dump["cycles"], 3 * Interpreter.TICKS_PER_FRAME)
+        self.assertEqual(len(dump["display"]), Interpreter.CHIP8_HEIGHT)
+        self.assertIn("1", "".join(dump["display"]))
+
+    @patch.object(core, 'getrandbits', lambda _: 0x5A)
+    def test_save_and_load_state(self):
+        with tempfile.TemporaryDirectory() as directory:
+            state_path = os.path.join(directory, "state.json")
+            self.run_main("PONG", "--headless", "--frames", "20", "--save-state", state_path)
+            resumed = self.run_main("PONG", "--headless", "--frames", "40", "--load-state", state_path)
+        straight = self.run_main("PONG", "--headless", "--frames", "40")
+        self.assertEqual(resumed, straight)
+
+    def test_scripted_input(self):
+        with tempfile.TemporaryDirectory() as directory:
+            script_path = os.path.join(directory, "keys.txt")
+            with open(script_path, "w") as f:
+                f.write("# hold 5\n0 100 5\n")
+            interpreter = main.create_interpreter(main.parse_args(["PONG", "--headless", "--input", script_path]))
+        main.run(interpreter, cycles=1)
+        self.assertEqual(interpreter.input, [0] * 5 + [1] + [0] * 10)
+
+
+class FuzzerTest(unittest.TestCase):
+
+    def test_saves_crashes(self):
+        with tempfile.TemporaryDirectory() as directory:
+            fuzzer = Fuzzer([bytes([0x00, 0xEE])], directory, cycles=10, seed=0)  # RET with an empty stack
+            fuzzer.run(executions=1)
+            self.assertEqual(list(fuzzer.crashes), [("StackUnderflow", 0x200)])
+            self.assertEqual(sorted(os.listdir(directory)), ["crash-StackUnderflow-200.ch8",
+                                                             "crash-StackUnderflow-200.keys",
+                                                             "crash-StackUnderflow-200.seed"])
+
+    def test_rnd_is_reproducible(self):
+        rom = bytes([0xC0, 0xFF, 0xC1, 0xFF, 0x12, 0x04])  # RND V0, 0xFF; RND V1, 0xFF; JP 0x204
+        fuzzer = Fuzzer([rom], cycles=10, seed=0)
+        fuzzer.execute(rom, [0], rnd_seed=1234)
+        registers = fuzzer.vm.registers[:2]
+        random.random()
+        fuzzer.execute(rom, [0], rnd_seed=1234)
+        self.assertEqual(fuzzer.vm.registers[:2], registers)
+
+        runs = []
+        for _ in range(2):
+            fuzzer = Fuzzer([rom], cycles=10, seed=7)
+            fuzzer.run(executions=20)
+            runs.append(fuzzer.corpus)
+        self.assertEqual(runs[0], runs[1])
+
+    def test_random_opcodes_keep_their_instruction(self):
+        fuzzer = Fuzzer([bytes(2)], seed=0)
+        for _ in range(1000):
+            op_code = fuzzer.random_opcode()
+            self.assertIn(op_code & OPCODE_MASKS[op_code >> 12], INTERESTING_OPCODES)
+
+    def test_tracks_coverage(self):
+        fuzzer = Fuzzer([bytes([0x60, 0x01, 0x12, 0x00])], cycles=100, seed=0)  # LD V0, 1; JP 0x200
+        stats = fuzzer.run(executions=50)
+        self.assertEqual(stats["executions"], 50)
+        self.assertGreaterEqual(stats["pc_coverage"], 2)
+        self.assertGreaterEqual(stats["opcode_coverage"], 2)
+        self.assertGreater(len(fuzzer.corpus), 1)
+
+
+class GoldenTest(unittest.TestCase):  # Re-record with `python3 golden.py --record` after an intended change
+
+    def test_roms_match_goldens(self):
+        goldens = golden.load()
+        for name in golden.rom_names():
+            with self.subTest(rom=name):
+                self.assertIn(name, goldens["roms"])
+                self.assertIsNone(golden.compare(name, goldens["roms"][name], goldens["frames"], goldens["script"]))
+
+    def test_scripted_input(self):
+        script = ScriptedInput([(2, 4, 0x5), (3, 5, 0xA)])
+        self.assertEqual(script.keys_at(0), [0] * 16)
+        self.assertEqual(script.keys_at(3), [0] * 5 + [1] + [0] * 4 + [1] + [0] * 5)
+        self.assertEqual(script.keys_at(4), [0] * 10 + [1] + [0] * 5)
+        self.assertEqual(script.keys_at(100), [0] * 16)
+
+
 if __name__ == '__main__':
     unittest.main()
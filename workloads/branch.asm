@@ -0,0 +1,16 @@
+; Branch heavy: nested count down loops full of skips, jumps, calls and returns
+outer:  LD V0, 0xFF
+inner:  CALL check
+        ADD V0, 0xFF            ; V0 = V0 - 1
+        SE V0, 0
+        JP inner
+        ADD V1, 1
+        SNE V1, 0
+        JP V0, outer            ; V0 is 0 here
+        JP outer
+
+check:  SNE V0, 0x80
+        LD V2, 1
+        SE V0, V1
+        RET
+        RET
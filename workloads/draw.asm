@@ -0,0 +1,13 @@
+; DRW heavy: sweep a 15 row sprite across the whole screen, forever
+        LD I, sprite
+row:    LD V0, 0
+column: DRW V0, V1, 15
+        ADD V0, 8
+        SE V0, 64
+        JP column
+        ADD V1, 5
+        JP row
+
+sprite: DB 0b11111111, 0b10000001, 0b10111101, 0b10100101, 0b10100101
+        DB 0b10111101, 0b10000001, 0b11111111, 0b00011000, 0b00111100
+        DB 0b01111110, 0b11111111, 0b01111110, 0b00111100, 0b00011000
@@ -0,0 +1,15 @@
+; Memory copy heavy: copy a 240 byte buffer 12 bytes at a time with LD VB, [I] and LD [I], VB, forever
+start:  LD VE, 0
+copy:   LD I, source
+        ADD I, VE
+        LD VB, [I]
+        LD I, destination
+        ADD I, VE
+        LD [I], VB
+        ADD VE, 12
+        SE VE, 240
+        JP copy
+        JP start
+
+source:      DS 240, 0xA5
+destination: DS 240